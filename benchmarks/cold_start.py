@@ -0,0 +1,188 @@
+"""
+Cold start benchmark for the three apps.
+
+Every run starts a fresh interpreter in the app's directory (the apps import
+each other as top level modules) and times the stages separately:
+
+    import_dependencies  dash, dash_bootstrap_components, plotly, pandas, numpy
+    import_app           the app's entry module
+    data_load            loading the dataset, where the app has one
+    layout               building the layout and the page layouts
+    dash_layout          first GET /_dash-layout through the Flask test client
+    dash_dependencies    first GET /_dash-dependencies
+
+The COVID app reads a synthetic fixture dataset, so nothing touches the
+network. The median of all runs is written as JSON and can be compared
+against a saved baseline:
+
+    python benchmarks/cold_start.py --runs 5 --save-baseline
+    python benchmarks/cold_start.py --runs 5 --compare
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results', 'cold_start.json')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baselines', 'cold_start.json')
+
+APPS = {
+    'covid_19': {'module': 'index', 'pages': ['/about', '/daily-dashboard', '/animations']},
+    'multipage_test': {'module': 'index', 'pages': []},
+    'upload_select': {'module': 'upload_select', 'pages': []},
+}
+DEPENDENCIES = ['numpy', 'pandas', 'plotly.graph_objects', 'dash', 'dash_bootstrap_components']
+STAGES = ['import_dependencies', 'import_app', 'data_load', 'layout', 'dash_layout', 'dash_dependencies']
+
+# a stage regresses when it is this much slower than the baseline and the
+# difference is larger than the noise floor
+TOLERANCE = 0.2
+NOISE_FLOOR_MS = 5.0
+
+
+def timed(timings, stage, func):
+    start = time.perf_counter()
+    result = func()
+    timings[stage] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def load_data(app_name):
+    if app_name == 'covid_19':
+        import dataset
+        dataset.current()
+
+
+def build_layouts(app, app_name, pages):
+    with app.server.test_request_context('/'):
+        layout = app.layout() if callable(app.layout) else app.layout
+    if app_name == 'covid_19':
+        import pages as page_registry
+        for page in pages:
+            page_registry.page_layout(page.strip('/'))
+    return layout
+
+
+def measure(app_name):
+    # runs in the child process, with the app directory as working directory
+    config = APPS[app_name]
+    sys.path.insert(0, os.getcwd())
+    timings, sizes = {}, {}
+
+    timed(timings, 'import_dependencies', lambda: [importlib.import_module(name) for name in DEPENDENCIES])
+    module = timed(timings, 'import_app', lambda: importlib.import_module(config['module']))
+    app = getattr(module, 'app', None)
+    if app is None:
+        return {'timings': timings, 'sizes': sizes, 'note': 'no Dash app found'}
+
+    timed(timings, 'data_load', lambda: load_data(app_name))
+    timed(timings, 'layout', lambda: build_layouts(app, app_name, config['pages']))
+
+    client = app.server.test_client()
+    for stage, url in [('dash_layout', '/_dash-layout'), ('dash_dependencies', '/_dash-dependencies')]:
+        response = timed(timings, stage, lambda: client.get(url))
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+        sizes[stage] = len(response.get_data())
+    return {'timings': timings, 'sizes': sizes}
+
+
+def prepare_fixture(work_dir):
+    sys.path.insert(0, BENCHMARK_DIR)
+    from fixtures import write_covid_fixture
+
+    source = write_covid_fixture(os.path.join(work_dir, 'source'))
+    snapshot_dir = os.path.join(work_dir, 'snapshot')
+    env = dict(os.environ, COVID_DATA_SOURCE=source, COVID_SNAPSHOT_DIR=snapshot_dir, COVID_REFRESH='0')
+    # the snapshot is written once up front, data_load measures reading it
+    subprocess.run([sys.executable, 'data_store.py', '--source', source, '--snapshot-dir', snapshot_dir],
+                   cwd=os.path.join(ROOT_DIR, 'covid_19'), env=env, check=True, stdout=subprocess.DEVNULL)
+    return env
+
+
+def run_child(app_name, env):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', app_name],
+        cwd=os.path.join(ROOT_DIR, app_name), env=env, check=True, capture_output=True, text=True
+    ).stdout
+    # the apps may print while importing, the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    result = {'timings': {}, 'sizes': runs[0].get('sizes', {})}
+    for stage in STAGES:
+        values = [run['timings'][stage] for run in runs if stage in run['timings']]
+        if values:
+            result['timings'][stage] = round(statistics.median(values), 3)
+    if 'note' in runs[0]:
+        result['note'] = runs[0]['note']
+    return result
+
+
+def compare(results, baseline):
+    regressions = []
+    for app_name, result in results.items():
+        base_timings = baseline.get(app_name, {}).get('timings', {})
+        for stage, value in result['timings'].items():
+            base = base_timings.get(stage)
+            if base is None:
+                continue
+            if value > base * (1 + TOLERANCE) and value - base > NOISE_FLOOR_MS:
+                regressions.append((app_name, stage, base, value))
+            print(f'{app_name:16} {stage:20} {base:10.1f} ms -> {value:10.1f} ms ({value / max(base, 1e-9):5.2f}x)')
+    for app_name, stage, base, value in regressions:
+        print(f'REGRESSION {app_name} {stage}: {base:.1f} ms -> {value:.1f} ms')
+    return regressions
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--apps', nargs='+', default=list(APPS), choices=list(APPS))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = prepare_fixture(work_dir)
+        # keep uploads and datasets of upload_select out of the real temp dirs
+        env.update(UPLOAD_DIR=os.path.join(work_dir, 'uploads'),
+                   DATASET_STORE_DIR=os.path.join(work_dir, 'datasets'))
+        results = {
+            app_name: summarize([run_child(app_name, env) for _ in range(args.runs)])
+            for app_name in args.apps
+        }
+
+    write_json(args.output, results)
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.save_baseline:
+        write_json(args.baseline, results)
+    if args.compare:
+        with open(args.baseline) as f:
+            return 1 if compare(results, json.load(f)) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Deterministic synthetic datasets for the benchmarks.
+
+write_covid_fixture() writes the three time series CSVs in the layout of the
+source repository (Province/State, Country/Region, Lat, Long, then one
+'m/d/yy' column per day), so it can be used as COVID_DATA_SOURCE.
+write_upload_csv() writes a mixed type CSV to feed upload_select.
+"""
+import datetime as dt
+import os
+
+import numpy as np
+import pandas as pd
+
+COVID_STATES = ['Confirmed', 'Deaths', 'Recovered']
+# same name pattern as data_store.SOURCE_FILE
+SOURCE_FILE = 'time_series_19-covid-{}.csv'
+FIRST_DAY = dt.date(2020, 1, 22)
+
+
+def source_day(day):
+    return f'{day.month}/{day.day}/{day:%y}'
+
+
+def covid_counts(regions, days, seed=0):
+    rng = np.random.default_rng(seed)
+    # every region starts on a random day and grows at its own rate
+    start = rng.integers(0, max(days // 2, 1), size=regions)
+    rate = rng.gamma(2.0, 2.0, size=regions)
+    growth = np.clip(np.arange(days)[None, :] - start[:, None], 0, None) * rate[:, None] / 10
+    new_cases = rng.poisson(growth)
+    confirmed = np.cumsum(new_cases, axis=1)
+    deaths = np.cumsum(rng.binomial(new_cases, 0.03), axis=1)
+    recovered = np.cumsum(rng.binomial(new_cases, 0.6), axis=1)
+    return confirmed, deaths, recovered
+
+
+def covid_regions(regions, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    countries = max(regions // 4, 1)
+    return pd.DataFrame({
+        'Province/State': [f'Province {i}' if i % 3 else None for i in range(regions)],
+        'Country/Region': [f'Country {i % countries}' for i in range(regions)],
+        'Lat': np.round(rng.uniform(-55, 70, size=regions), 4),
+        'Long': np.round(rng.uniform(-180, 180, size=regions), 4)
+    })
+
+
+def write_covid_fixture(directory, regions=300, days=60, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    regions_df = covid_regions(regions, seed)
+    columns = [source_day(FIRST_DAY + dt.timedelta(days=i)) for i in range(days)]
+    for covid_state, counts in zip(COVID_STATES, covid_counts(regions, days, seed)):
+        df = pd.concat([regions_df, pd.DataFrame(counts, columns=columns)], axis=1)
+        df.to_csv(os.path.join(directory, SOURCE_FILE.format(covid_state)), index=False)
+    return directory
+
+
+def write_upload_csv(path, rows=1000000, seed=0, chunk_rows=250000):
+    # written in chunks so generating millions of rows doesn't need the
+    # whole frame in memory
+    rng = np.random.default_rng(seed)
+    categories = np.array(['red', 'green', 'blue', 'cyan', 'magenta', 'yellow', 'black', 'white'])
+    first = True
+    for start in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - start)
+        value = rng.normal(100, 25, size=size)
+        value[rng.random(size) < 0.05] = np.nan
+        df = pd.DataFrame({
+            'id': np.arange(start, start + size),
+            'category': categories[rng.integers(0, len(categories), size=size)],
+            'value': np.round(value, 3),
+            'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365, size=size), unit='D'),
+            'label': [f'item-{i}' for i in rng.integers(0, 10 * rows, size=size)]
+        })
+        df.to_csv(path, mode='w' if first else 'a', header=first, index=False)
+        first = False
+    return path
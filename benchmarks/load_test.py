@@ -0,0 +1,336 @@
+"""
+Load test replaying the callback traffic of a browser session.
+
+Each virtual user plays scenarios the way the Dash renderer would: it keeps
+the props of the components it has seen, and every prop change POSTs to
+_dash-update-component for every server callback taking that prop as
+input. Props returned by a callback trigger the next callbacks in the
+chain, and so do the props of the components in a returned layout. The
+callbacks are read from _dash-dependencies, so clientside callbacks are
+skipped just like in the browser.
+
+    scrub   jump the date picker of the daily dashboard to random dates
+    burst   click the previous and next day buttons in a row
+    pages   switch between the pages of the COVID app
+    upload  upload a CSV in chunks and page through its preview
+
+The requests go to the Flask test client of the app (imported with the
+fixture dataset of the benchmarks) or, with --url, to a running server.
+Throughput, p50/p95/p99 latency and the error rate are reported per
+callback, labelled by its first output.
+
+    python benchmarks/load_test.py --app covid_19 --users 8 --sessions 200
+    python benchmarks/load_test.py --app upload_select --url http://127.0.0.1:8050
+"""
+import argparse
+import collections
+import datetime as dt
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results', 'load_test.json')
+
+APPS = {
+    'covid_19': {'module': 'index', 'scenarios': ['scrub', 'burst', 'pages']},
+    'upload_select': {'module': 'upload_select', 'scenarios': ['upload']},
+}
+COVID_PAGES = ['/about', '/daily-dashboard', '/animations']
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+# callback chains longer than this are cut, a runaway loop would never end
+MAX_CHAIN = 20
+
+
+class ClientTransport:
+    """Requests through the Flask test client, one client per thread."""
+
+    def __init__(self, server):
+        self.server = server
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, content_type=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.server.test_client()
+        response = client.open(path, method=method, data=body, content_type=content_type)
+        return response.status_code, response.get_data()
+
+
+class HTTPTransport:
+    """Requests to a running server."""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def request(self, method, path, body=None, content_type=None):
+        headers = {'Content-Type': content_type} if content_type else {}
+        request = urllib.request.Request(self.url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def split_outputs(output):
+    # multi output callbacks are registered as '..a.prop...b.prop..'
+    if output.startswith('..'):
+        parts = output[2:-2].split('...')
+    else:
+        parts = [output]
+    return [dict(zip(('id', 'property'), part.rsplit('.', 1))) for part in parts]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def record(self, label, seconds, ok):
+        with self.lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+    def report(self, elapsed):
+        report = {}
+        for label, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            report[label] = {
+                'requests': len(values),
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'error_rate': round(self.errors[label] / len(values), 4),
+                **{f'p{q}_ms': round(percentile(values, q) * 1000, 3) for q in (50, 95, 99)}
+            }
+        return report
+
+
+def percentile(values, q):
+    return values[min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)]
+
+
+class Session:
+    """The component props one browser tab knows about."""
+
+    def __init__(self, transport, callbacks, recorder):
+        self.transport = transport
+        self.callbacks = callbacks
+        self.recorder = recorder
+        self.props = {}
+
+    def timed(self, label, method, path, body=None, content_type=None):
+        start = time.perf_counter()
+        try:
+            status, data = self.transport.request(method, path, body, content_type)
+        except Exception:
+            status, data = 599, b''
+        self.recorder.record(label, time.perf_counter() - start, status < 400)
+        return status, data
+
+    def fire(self, prop_values):
+        # breadth first through the callback chain, like the renderer does
+        pending = [dict(prop_values)]
+        self.props.update(prop_values)
+        for _ in range(MAX_CHAIN):
+            if not pending:
+                break
+            changed = pending.pop(0)
+            for callback in self.callbacks:
+                triggers = [f"{i['id']}.{i['property']}" for i in callback['inputs']]
+                changed_ids = [prop_id for prop_id in triggers if prop_id in changed]
+                if changed_ids:
+                    updates = self.call(callback, changed_ids)
+                    if updates:
+                        self.props.update(updates)
+                        pending.append(updates)
+
+    def call(self, callback, changed_ids):
+        outputs = split_outputs(callback['output'])
+
+        def values(deps):
+            return [dict(dep, value=self.props.get(f"{dep['id']}.{dep['property']}")) for dep in deps]
+
+        body = {
+            'output': callback['output'],
+            'outputs': outputs if callback['output'].startswith('..') else outputs[0],
+            'inputs': values(callback['inputs']),
+            'state': values(callback.get('state', [])),
+            'changedPropIds': changed_ids,
+        }
+        label = f"{outputs[0]['id']}.{outputs[0]['property']}"
+        status, data = self.timed(label, 'POST', '/_dash-update-component',
+                                  json.dumps(body).encode(), 'application/json')
+        if status != 200:
+            return {}
+        payload = json.loads(data)
+        if 'multi' in payload:
+            response = payload['response']
+        else:
+            response = {outputs[0]['id']: payload['response']['props']}
+        updates = {}
+        for component_id, props in response.items():
+            for prop, value in props.items():
+                updates[f'{component_id}.{prop}'] = value
+                updates.update(layout_props(value))
+        return updates
+
+
+def components(tree):
+    if isinstance(tree, dict) and 'props' in tree:
+        yield tree['props']
+        yield from components(tree['props'].get('children'))
+    elif isinstance(tree, list):
+        for child in tree:
+            yield from components(child)
+
+
+def layout_props(tree):
+    # a new layout fires the callbacks of its components, like on page load
+    return {f"{props['id']}.{prop}": value
+            for props in components(tree) if isinstance(props.get('id'), str)
+            for prop, value in props.items() if prop not in ('id', 'children')}
+
+
+def find_component(tree, component_id):
+    return next((props for props in components(tree) if props.get('id') == component_id), None)
+
+
+def dashboard_days(session):
+    # the dates come from the date picker of the page, so the load test
+    # doesn't need the dataset of the server
+    session.fire({'url.pathname': '/daily-dashboard'})
+    picker = find_component(session.props.get('page-content.children'), 'date-picker-single')
+    first = dt.date.fromisoformat(picker['min_date_allowed'][:10])
+    last = dt.date.fromisoformat(picker['max_date_allowed'][:10])
+    return [str(first + dt.timedelta(days=i)) for i in range((last - first).days + 1)]
+
+
+def scrub(session, rng, context, steps):
+    for _ in range(steps):
+        session.fire({'date-picker-single.date': rng.choice(context['days'])})
+
+
+def burst(session, rng, context, steps):
+    session.fire({'date-picker-single.date': rng.choice(context['days'])})
+    clicks = {'previous-day-button': 0, 'next-day-button': 0}
+    for _ in range(steps):
+        button = rng.choice(list(clicks))
+        clicks[button] += 1
+        session.fire({f'{button}.n_clicks': clicks[button]})
+
+
+def pages(session, rng, context, steps):
+    for _ in range(steps):
+        session.fire({'url.pathname': rng.choice(COVID_PAGES)})
+
+
+def upload(session, rng, context, steps):
+    payload = context['upload']
+    status, data = session.timed('upload:start', 'POST', '/_upload/start')
+    if status != 200:
+        return
+    handle = json.loads(data)['handle']
+    for offset in range(0, len(payload), UPLOAD_CHUNK_BYTES):
+        status, _ = session.timed('upload:chunk', 'POST', f'/_upload/{handle}?offset={offset}',
+                                  payload[offset:offset + UPLOAD_CHUNK_BYTES], 'application/octet-stream')
+        if status != 200:
+            return
+    status, _ = session.timed('upload:finish', 'POST', f'/_upload/{handle}/finish?filename=load_test.csv')
+    if status != 200:
+        return
+    session.fire({'data-table.page_current': 0, 'data-table.page_size': 20, 'upload-handle.value': handle})
+    page_count = session.props.get('data-table.page_count') or 1
+    for _ in range(steps):
+        session.fire({'data-table.page_current': rng.randrange(page_count)})
+
+
+SCENARIOS = {'scrub': scrub, 'burst': burst, 'pages': pages, 'upload': upload}
+
+
+def start_app(app_name, work_dir):
+    # imports the app in this process, against the fixture data
+    sys.path.insert(0, BENCHMARK_DIR)
+    from cold_start import prepare_fixture
+
+    os.environ.update(prepare_fixture(work_dir) if app_name == 'covid_19' else {})
+    os.environ.update(UPLOAD_DIR=os.path.join(work_dir, 'uploads'),
+                      DATASET_STORE_DIR=os.path.join(work_dir, 'datasets'))
+    app_dir = os.path.join(ROOT_DIR, app_name)
+    os.chdir(app_dir)
+    sys.path.insert(0, app_dir)
+    module = __import__(APPS[app_name]['module'])
+    return ClientTransport(module.app.server)
+
+
+def run(transport, app_name, scenarios, users, sessions, steps, upload_rows, work_dir, seed):
+    status, data = transport.request('GET', '/_dash-dependencies')
+    if status != 200:
+        raise RuntimeError(f'/_dash-dependencies returned {status}')
+    callbacks = [callback for callback in json.loads(data) if not callback.get('clientside_function')]
+    recorder = Recorder()
+
+    context = {}
+    if 'upload' in scenarios:
+        from fixtures import write_upload_csv
+        with open(write_upload_csv(os.path.join(work_dir, 'load_test.csv'), rows=upload_rows), 'rb') as f:
+            context['upload'] = f.read()
+    if app_name == 'covid_19':
+        context['days'] = dashboard_days(Session(transport, callbacks, Recorder()))
+
+    def play(index):
+        rng = random.Random(seed + index)
+        session = Session(transport, callbacks, recorder)
+        if app_name == 'covid_19':
+            session.fire({'url.pathname': '/daily-dashboard'})
+        SCENARIOS[rng.choice(scenarios)](session, rng, context, steps)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(play, range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {'elapsed_s': round(elapsed, 3), 'callbacks': recorder.report(elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='covid_19', choices=list(APPS))
+    parser.add_argument('--url', help='a running server, instead of the test client')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS))
+    parser.add_argument('--users', type=int, default=4, help='concurrent sessions')
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--steps', type=int, default=10, help='actions per session')
+    parser.add_argument('--upload-rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args()
+    scenarios = args.scenarios or APPS[args.app]['scenarios']
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        transport = HTTPTransport(args.url) if args.url else start_app(args.app, work_dir)
+        sys.path.insert(0, BENCHMARK_DIR)
+        results = run(transport, args.app, scenarios, args.users, args.sessions, args.steps,
+                      args.upload_rows, work_dir, args.seed)
+    results.update(app=args.app, scenarios=scenarios, users=args.users, sessions=args.sessions)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"{'callback':40} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, stats in results['callbacks'].items():
+        print(f"{label:40} {stats['requests']:9d} {stats['throughput_rps']:9.1f} {stats['p50_ms']:9.1f} "
+              f"{stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['error_rate']:7.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
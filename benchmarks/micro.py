@@ -0,0 +1,195 @@
+"""
+Micro benchmarks of the dashboard and upload functions at synthetic scale.
+
+Two suites run in their own interpreter, in the directory of their app:
+
+    covid   draw_infection_map, draw_curve, update_total, update_change,
+            move_date and the derived series of all regions (derive) on a
+            synthetic dataset of --regions x --days
+    upload  read_upload of the preview head and of the whole file,
+            ingest_upload and profile_dataset on a synthetic CSV of --rows rows
+
+Every function reports the best wall time of --repeat runs and the peak
+memory traced by tracemalloc during one extra run.
+
+    python benchmarks/micro.py --regions 10000 --days 2000 --rows 2000000
+"""
+import argparse
+import contextlib
+import gc
+import inspect
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, 'results', 'micro.json')
+SUITES = {'covid': 'covid_19', 'upload': 'upload_select'}
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'best_ms': round(min(times) * 1000, 3), 'peak_mb': round(peak / 2 ** 20, 3)}
+
+
+@contextlib.contextmanager
+def triggered(server, prop_id):
+    # move_date reads dash.callback_context, which lives in flask.g in dash 1.x
+    # and in a context variable in dash 2.x
+    import flask
+    with server.test_request_context('/_dash-update-component', method='POST'):
+        flask.g.triggered_inputs = [{'prop_id': prop_id, 'value': 1}]
+        try:
+            from dash._callback_context import context_value
+            from dash._utils import AttributeDict
+        except ImportError:
+            yield
+            return
+        token = context_value.set(AttributeDict(triggered_inputs=flask.g.triggered_inputs))
+        try:
+            yield
+        finally:
+            context_value.reset(token)
+
+
+def covid_suite(args, work_dir):
+    import dataset
+    import derived
+    from app import app
+    from apps import daily_dashboard
+
+    ds = dataset.current()
+    days = ds.cube.days
+    day = days[len(days) // 2]
+    # call the functions themselves rather than dash's request wrappers
+    update_total = inspect.unwrap(daily_dashboard.update_total)
+    update_change = inspect.unwrap(daily_dashboard.update_change)
+    move_date = inspect.unwrap(daily_dashboard.move_date)
+
+    def step_forward():
+        with triggered(app.server, 'next-day-button.n_clicks'):
+            move_date(None, 1, day)
+
+    return {
+        'draw_infection_map': measure(lambda: daily_dashboard.draw_infection_map(ds, day), args.repeat),
+        'draw_curve': measure(lambda: daily_dashboard.draw_curve(ds.cube, day), args.repeat),
+        'update_total': measure(lambda: update_total(day, None), args.repeat),
+        'update_change': measure(lambda: update_change(day, None), args.repeat),
+        'move_date': measure(step_forward, args.repeat),
+        'derive': measure(lambda: derived.derive(ds.snapshot.tables['Confirmed'].counts), args.repeat),
+    }
+
+
+def upload_suite(args, work_dir):
+    import uploads
+    import upload_select
+    from fixtures import write_upload_csv
+
+    # register the file the way the upload routes do
+    handle = '0' * 32
+    path = write_upload_csv(os.path.join(work_dir, 'upload.csv'), rows=args.rows)
+    os.makedirs(uploads.UPLOAD_DIR, exist_ok=True)
+    shutil.move(path, uploads.upload_path(handle))
+    with open(uploads.upload_path(handle) + '.json', 'w') as f:
+        json.dump({'handle': handle, 'filename': 'upload.csv',
+                          'size': os.path.getsize(uploads.upload_path(handle)),
+                          'sha256': uploads.file_digest(uploads.upload_path(handle))}, f)
+
+    def ingest():
+        dataset_id = upload_select.dataset_id_for(handle)
+        if upload_select.dataset_store.exists(dataset_id):
+            os.remove(upload_select.dataset_store.dataset_path(dataset_id))
+        upload_select.ingest_upload(handle)
+
+    # read_upload is what parse_upload runs on a cache miss
+    results = {
+        'read_upload_head': measure(lambda: upload_select.read_upload(handle, upload_select.PREVIEW_ROWS),
+                                    args.repeat),
+        'read_upload': measure(lambda: upload_select.read_upload(handle), args.repeat),
+        'ingest_upload': measure(ingest, args.repeat),
+    }
+    dataset_id = upload_select.dataset_id_for(handle)
+    results['profile_dataset'] = measure(
+        lambda: upload_select.profile_dataset.__wrapped__(dataset_id), args.repeat)
+    return results
+
+
+def run_suite(suite, args, work_dir):
+    # runs in the child process, with the app directory as working directory
+    sys.path.insert(0, os.getcwd())
+    sys.path.insert(1, BENCHMARK_DIR)
+    if suite == 'covid':
+        return covid_suite(args, work_dir)
+    return upload_suite(args, work_dir)
+
+
+def child_env(suite, args, work_dir):
+    env = dict(os.environ, UPLOAD_DIR=os.path.join(work_dir, 'uploads'),
+               DATASET_STORE_DIR=os.path.join(work_dir, 'datasets'))
+    if suite == 'covid':
+        sys.path.insert(0, BENCHMARK_DIR)
+        from fixtures import write_covid_fixture
+
+        source = write_covid_fixture(os.path.join(work_dir, 'source'), regions=args.regions, days=args.days)
+        snapshot_dir = os.path.join(work_dir, 'snapshot')
+        subprocess.run([sys.executable, 'data_store.py', '--source', source, '--snapshot-dir', snapshot_dir],
+                       cwd=os.path.join(ROOT_DIR, 'covid_19'), check=True, stdout=subprocess.DEVNULL)
+        env.update(COVID_DATA_SOURCE=source, COVID_SNAPSHOT_DIR=snapshot_dir, COVID_REFRESH='0')
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--suites', nargs='+', default=list(SUITES), choices=list(SUITES))
+    parser.add_argument('--regions', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_suite(args.child, args, args.work_dir)))
+        return 0
+
+    scale = {'regions': args.regions, 'days': args.days, 'rows': args.rows}
+    results = {'scale': scale}
+    for suite in args.suites:
+        with tempfile.TemporaryDirectory() as work_dir:
+            command = [sys.executable, os.path.abspath(__file__), '--child', suite, '--work-dir', work_dir,
+                       '--regions', str(args.regions), '--days', str(args.days),
+                       '--rows', str(args.rows), '--repeat', str(args.repeat)]
+            output = subprocess.run(command, cwd=os.path.join(ROOT_DIR, SUITES[suite]),
+                                    env=child_env(suite, args, work_dir),
+                                    check=True, capture_output=True, text=True).stdout
+            results[suite] = json.loads(output.strip().splitlines()[-1])
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    for suite in args.suites:
+        for name, result in results[suite].items():
+            print(f'{suite:8} {name:20} {result["best_ms"]:12.3f} ms {result["peak_mb"]:10.2f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,25 @@
+import glob
+import os
 import dash
 import dash_bootstrap_components as dbc
+import dataset
+import http_cache
+import metrics
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SUPERHERO])
+# the theme comes from the CDN until tools/vendor_themes.py put it in assets/
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+THEME = [] if glob.glob(os.path.join(ASSETS_DIR, 'theme.*.css')) else [dbc.themes.SUPERHERO]
+
+app = dash.Dash(__name__, external_stylesheets=THEME)
 server = app.server
 app.config.suppress_callback_exceptions = True
 
+# per callback latency and payload sizes on /metrics, has to be set up before
+# the pages register their callbacks
+if os.environ.get('DASH_METRICS', '') == '1':
+    metrics.instrument(app)
+
+# compression, ETags and the callback response cache, HTTP_CACHE=0 turns them off
+if os.environ.get('HTTP_CACHE', '1') == '1':
+    http_cache.install(server, version=lambda: dataset.current().version if dataset.is_loaded() else None)
+
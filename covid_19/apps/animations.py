@@ -1,6 +1,127 @@
 import dash_html_components as html
+import dash_core_components as dcc
+import dash_bootstrap_components as dbc
+from dash.dependencies import Input, Output
 from app import app
+from apps.daily_dashboard import MAP_LAYOUT
+import dataset
+from map_traces import map_traces
+import frame_store
+
+FRAME_RATES = [2, 5, 10, 20]
+DAY_STRIDES = [1, 2, 3, 7]
+
+
+def build_animation(ds, day_stride):
+    days = frame_store.stride_days(ds.cube.days, day_stride)
+    table = ds.snapshot.tables['Confirmed']
+    traces = map_traces(table, [ds.cube.date_index[day] for day in days], ds.map_labels)
+    return {
+        'data': traces[:1],
+        'frames': [{'name': day, 'data': [trace]} for day, trace in zip(days, traces)]
+    }
+
+
+def animation_controls(days, frame_rate):
+    frame_args = dict(
+        frame=dict(duration=int(1000 / frame_rate), redraw=True),
+        mode='immediate',
+        fromcurrent=True,
+        transition=dict(duration=0)
+    )
+    updatemenus = [dict(
+        type='buttons',
+        showactive=False,
+        x=0.05,
+        y=0.05,
+        xanchor='left',
+        yanchor='bottom',
+        buttons=[
+            dict(label='Play', method='animate', args=[None, frame_args]),
+            dict(label='Pause', method='animate',
+                 args=[[None], dict(frame=dict(duration=0, redraw=False), mode='immediate')])
+        ]
+    )]
+    sliders = [dict(
+        active=0,
+        currentvalue=dict(prefix='Date: ', font=dict(color='#fff')),
+        font=dict(color='#fff'),
+        pad=dict(t=30),
+        steps=[dict(label=day, method='animate', args=[[day], frame_args]) for day in days]
+    )]
+    return updatemenus, sliders
+
+
+def draw_infection_animation(frame_rate, day_stride):
+    ds = dataset.current()
+    animation = frame_store.load_frames(ds.version, day_stride, lambda stride: build_animation(ds, stride))
+    days = [frame['name'] for frame in animation['frames']]
+    updatemenus, sliders = animation_controls(days, frame_rate)
+    layout = dict(MAP_LAYOUT, height=600, updatemenus=updatemenus, sliders=sliders)
+    # animate the frames without the morphing transition of the daily map
+    layout.pop('transition')
+    return {'data': animation['data'], 'frames': animation['frames'], 'layout': layout}
+
+
+animation_nav = dbc.NavbarSimple(
+    children=[
+        dbc.Row(
+            children=[
+                html.Div('Frames per second', className='mr-2 text-white'),
+                dcc.Dropdown(
+                    id='animation-frame-rate',
+                    options=[{'label': i, 'value': i} for i in FRAME_RATES],
+                    value=5,
+                    clearable=False,
+                    style={'width': '5rem'}
+                ),
+                html.Div('Every n-th day', className='ml-3 mr-2 text-white'),
+                dcc.Dropdown(
+                    id='animation-day-stride',
+                    options=[{'label': i, 'value': i} for i in DAY_STRIDES],
+                    value=1,
+                    clearable=False,
+                    style={'width': '5rem'}
+                )
+            ],
+            align='center',
+            no_gutters=True
+        )
+    ],
+    brand='COVID-19 Spread',
+    color='dark',
+    dark=True,
+    fluid=True,
+    sticky='top'
+)
 
 layout = html.Div(
-    'Animations'
-)
\ No newline at end of file
+    children=[
+        animation_nav,
+        dbc.Container(
+            children=[
+                dbc.Card(
+                    children=[
+                        dbc.CardHeader(html.H5('Confirmed Cases', className='card-title')),
+                        dbc.CardBody(
+                            dcc.Loading(
+                                dcc.Graph(id='infection-animation')
+                            )
+                        )
+                    ],
+                    className='mb-3 mt-3'
+                )
+            ],
+            fluid=True
+        )
+    ]
+)
+
+
+@app.callback(
+    Output('infection-animation', 'figure'),
+    [Input('animation-frame-rate', 'value'),
+     Input('animation-day-stride', 'value')]
+)
+def update_animation(frame_rate, day_stride):
+    return draw_infection_animation(frame_rate, day_stride)
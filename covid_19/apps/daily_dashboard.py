@@ -2,86 +2,91 @@ import dash
 import dash_html_components as html
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import plotly.graph_objects as go
 from app import app
-import pandas as pd
-import numpy as np
-import datetime as dt
-
-
-def convert_date(str_date):
-    str_to_date = dt.datetime.strptime(str_date, '%m/%d/%y')
-    date_to_str = dt.datetime.strftime(str_to_date, '%Y-%m-%d')
-    return date_to_str
+import data_store
+import dataset
+import functools
+from cube import step_day
+from hierarchy import country_cube, province_rows
+import derived
+from figure_cache import FigureCache, prewarm
+from dash.exceptions import PreventUpdate
+import refresher
+from map_traces import map_traces
+import map_grid
+import compact
+import os
+
+try:
+    from dash import Patch
+except ImportError:
+    Patch = None
 
 
 # loading data
-COVID_STATES = ['Confirmed', 'Deaths', 'Recovered']
+COVID_STATES = data_store.COVID_STATES
 COVID_COLORS = ['warning', 'danger', 'success']
 
-
-urls = [f'https://raw.githubusercontent.com/bumbeishvili/'
-        f'covid19-daily-data/master/time_series_19-covid-{i}.csv'
-        for i in COVID_STATES]
-
-
-CONFIRMED, DEATHS, RECOVERED = [pd.read_csv(url) for url in urls]
-DAYS = list(CONFIRMED.columns)[4:]
-STR_TO_DATE = {str_date: convert_date(str_date) for str_date in DAYS}
-
-# need to rename date columns to avoid constant conversions later
-[df.rename(columns=STR_TO_DATE, inplace=True) for df in [CONFIRMED, DEATHS, RECOVERED]]
-
-ALL_DFS = [CONFIRMED, DEATHS, RECOVERED]
-DAYS_FOR_DISPLAY = list(CONFIRMED.columns)
-
-
-def draw_infection_map(df, day):
-    df = df[['Province/State', 'Country/Region', 'Lat', 'Long', day]].copy()
-    df = df[df[day] != 0]
-    map_trace = go.Scattergeo(
-        lat=df['Lat'],
-        lon=df['Long'],
-        marker=dict(
-            size=abs(df[day]/50),
-            sizemode='area',
-            color='#f0ad4e'
-        )
+# with COVID_CLIENTSIDE=1 the date navigation, the KPI cards and the curve run
+# in the browser from the data in the 'dashboard-data' store, see assets/dashboard.js
+CLIENTSIDE = os.environ.get('COVID_CLIENTSIDE', '') == '1'
+
+# with COVID_MAP_LOD=1 the map bins the regions by the zoom of the graph, see map_grid.py
+MAP_LOD = os.environ.get('COVID_MAP_LOD', '') == '1'
+
+
+MAP_LAYOUT = dict(
+    margin=dict(l=0, r=0, t=0, b=0),
+    geo=dict(
+        projection=dict(type='natural earth'),
+        landcolor='#4E5D6C',
+        showocean=True,
+        oceancolor='#4E5D6C',
+        showcountries=True,
+        countrycolor='#868e96',
+        coastlinecolor='#868e96',
+        showframe=False,
+        framewidth=0,
+        bgcolor='#4E5D6C'
+    ),
+    paper_bgcolor='#4E5D6C',
+    transition=dict(
+        duration=500,
+        easing='cubic-in-out'
     )
+)
 
 
-    layout = go.Layout(
-        margin=dict(l=0, r=0, t=0, b=0),
-        geo=dict(
-            projection=dict(type='natural earth'),
-            landcolor='#4E5D6C',
-            showocean=True,
-            oceancolor='#4E5D6C',
-            showcountries=True,
-            countrycolor='#868e96',
-            coastlinecolor='#868e96',
-            showframe=False,
-            framewidth=0,
-            bgcolor='#4E5D6C'
-        ),
-        paper_bgcolor='#4E5D6C',
-        transition=dict(
-            duration=500,
-            easing='cubic-in-out'
-        )
-    )
-
-    fig = go.Figure(data=[map_trace], layout=layout)
+def draw_infection_map(ds, day, map_trace=None, country=None, view=None):
+    if map_trace is None:
+        table = ds.snapshot.tables['Confirmed']
+        rows = province_rows(ds.hierarchy, 'Confirmed', country) if country else None
+        day_idx = ds.cube.date_index[day]
+        average = derived.region_average(table.counts, [day_idx])
+        if MAP_LOD:
+            map_trace = map_grid.grid_trace(ds.map_grid, table, day_idx, ds.map_labels,
+                                            view, rows, average=average[:, 0])
+        else:
+            map_trace = map_traces(table, [day_idx], ds.map_labels, rows=rows, average=average)[0]
+    # keeps the zoom of the user when the figure is replaced
+    fig = go.Figure(data=[map_trace], layout=go.Layout(MAP_LAYOUT, uirevision=country or 'world'))
+    if country:
+        # zoom onto the provinces of the country
+        fig.update_geos(fitbounds='locations')
     return fig
 
 
-def draw_curve(df1, df2, df3,  day):
-    day_idx = list(df1.columns).index(day) + 1
+def draw_curve(cube, day, series=None, metric='cumulative'):
+    # series is state x day, the totals of the cube by default
+    day_idx = cube.date_index[day] + 1
+    if series is None:
+        series = cube.totals
 
     df1_curve_trace = go.Scatter(
-        x=list(df1.columns)[4:],
-        y=list(np.sum(df1.iloc[:, 4:day_idx].copy(), axis=0)),
+        x=cube.days,
+        y=series[0, :day_idx].tolist(),
         mode='lines+markers',
         name='Confirmed',
         marker=dict(
@@ -89,8 +94,8 @@ def draw_curve(df1, df2, df3,  day):
     )
 
     df2_curve_trace = go.Scatter(
-        x=list(df2.columns)[4:],
-        y=list(np.sum(df2.iloc[:, 4:day_idx].copy(), axis=0)),
+        x=cube.days,
+        y=series[1, :day_idx].tolist(),
         mode='lines+markers',
         name='Deaths',
         marker=dict(
@@ -98,8 +103,8 @@ def draw_curve(df1, df2, df3,  day):
     )
 
     df3_curve_trace = go.Bar(
-        x=list(df3.columns)[4:],
-        y=list(np.sum(df3.iloc[:, 4:day_idx].copy(), axis=0)),
+        x=cube.days,
+        y=series[2, :day_idx].tolist(),
         name='Recovered',
         marker=dict(
             color='#5cb85c')
@@ -120,8 +125,9 @@ def draw_curve(df1, df2, df3,  day):
             showgrid=False,
             zeroline=False,
             color='#fff',
+            tickformat='.1%' if metric == 'growth' else None,
             title=dict(
-                text='Number of Cases')
+                text=derived.METRICS[metric][1])
         ),
         legend=dict(
             x=0.7,
@@ -132,6 +138,81 @@ def draw_curve(df1, df2, df3,  day):
     return fig
 
 
+def curve_kind(metric):
+    return 'curve' if metric in (None, 'cumulative') else f'curve-{metric}'
+
+
+def curve_builder(metric):
+    def build(ds, day, country=None, view=None):
+        cube = country_cube(ds.hierarchy, ds.cube, country)
+        return draw_curve(cube, day, derived.curve_series(ds, metric, country), metric)
+    return build
+
+
+FIGURE_BUILDERS = {
+    'map': lambda ds, day, country=None, view=None: draw_infection_map(ds, day, country=country, view=view),
+    **{curve_kind(metric): curve_builder(metric) for metric in derived.METRICS}
+}
+# the figures of the default view
+PREWARM_KINDS = ['map', 'curve']
+FIGURE_CACHE = FigureCache(
+    int(os.environ.get('COVID_FIGURE_CACHE_MB', 64)) * 1024 * 1024,
+    encode=compact.figure_json if compact.COMPACT else None
+)
+if compact.COMPACT:
+    compact.enable_fast_json()
+
+
+def cached_figure(kind, day, ds=None, country=None, view=None):
+    ds = ds or dataset.current()
+    # prewarm() fills the global figures, keyed (version, day, kind)
+    key = (ds.version, day, kind)
+    if country is not None or view is not None:
+        key += (country, view)
+    return FIGURE_CACHE.get(key, lambda: FIGURE_BUILDERS[kind](ds, day, country, view))
+
+
+# the inputs the layout of a figure depends on, the map zooms onto the
+# country and the axis of the curve follows the metric
+MAP_LAYOUT_INPUTS = {'country-select.value'}
+CURVE_LAYOUT_INPUTS = {'curve-metric.value'}
+
+
+def data_only(triggered, layout_inputs):
+    # only the traces changed unless one of the layout inputs triggered
+    return bool(triggered) and not layout_inputs.intersection(triggered)
+
+
+def figure_update(kind, day, ds=None, country=None, view=None, traces_only=False):
+    fig = cached_figure(kind, day, ds, country, view)
+    # only the traces are sent when dash can patch and the layout is unchanged
+    if traces_only and compact.COMPACT and Patch is not None:
+        patch = Patch()
+        patch['data'] = fig['data']
+        return patch
+    return fig
+
+
+def dashboard_data(ds, country=None, metric='cumulative'):
+    cube = country_cube(ds.hierarchy, ds.cube, country)
+    return {
+        'days': cube.days,
+        'totals': cube.totals.tolist(),
+        'changes': cube.changes.tolist(),
+        'curve': draw_curve(cube, cube.days[-1], derived.curve_series(ds, metric, country), metric).to_dict()
+    }
+
+
+def prewarm_figures(ds):
+    builders = {kind: functools.partial(FIGURE_BUILDERS[kind], ds) for kind in PREWARM_KINDS}
+    prewarm(FIGURE_CACHE, ds.version, ds.cube.days, builders)
+
+
+# fill the figure cache from the last day back in the background once the data is loaded
+if os.environ.get('COVID_PREWARM', '') == '1':
+    dataset.on_load(prewarm_figures)
+
+
 def render_kpi_card(covid_state, color):
     kpi_card = dbc.Col(
         dbc.Card(
@@ -169,34 +250,44 @@ def render_kpi_card(covid_state, color):
     return kpi_card
 
 
-dashboard_nav = dbc.NavbarSimple(
-    children=[
-        dbc.Button(
-            '<',
-            id='previous-day-button',
-            color='primary',
-            className='mr-1'
-        ),
-        dcc.DatePickerSingle(
-            id='date-picker-single',
-            date=convert_date(DAYS[-1]),
-            min_date_allowed=convert_date(DAYS[0]),
-            max_date_allowed=convert_date(DAYS[-1]),
-            display_format='DD MMM YYYY'
-        ),
-        dbc.Button(
-            '>',
-            id='next-day-button',
-            color='primary',
-            className='ml-1'
-        )
-    ],
-    brand='Daily COVID-19 Numbers',
-    color='dark',
-    dark=True,
-    fluid=True,
-    sticky='top'
-)
+def render_dashboard_nav(days, countries):
+    dashboard_nav = dbc.NavbarSimple(
+        children=[
+            dcc.Dropdown(
+                id='country-select',
+                options=[{'label': country, 'value': country} for country in countries],
+                placeholder='All countries',
+                style={'width': '14rem'},
+                className='mr-3'
+            ),
+            dbc.Button(
+                '<',
+                id='previous-day-button',
+                color='primary',
+                className='mr-1'
+            ),
+            dcc.DatePickerSingle(
+                id='date-picker-single',
+                date=days[-1],
+                min_date_allowed=days[0],
+                max_date_allowed=days[-1],
+                display_format='DD MMM YYYY'
+            ),
+            dbc.Button(
+                '>',
+                id='next-day-button',
+                color='primary',
+                className='ml-1'
+            )
+        ],
+        brand='Daily COVID-19 Numbers',
+        color='dark',
+        dark=True,
+        fluid=True,
+        sticky='top'
+    )
+    return dashboard_nav
+
 
 kpi_row = dbc.Row(
     children=[
@@ -206,107 +297,124 @@ kpi_row = dbc.Row(
         ]
 )
 
-charts_deck = dbc.CardDeck(
-            children=[
-                dbc.Card(
-                    children=[
-                        dbc.CardHeader(
-                            dbc.Row(
+
+def render_charts_deck(map_figure, curve_figure):
+    charts_deck = dbc.CardDeck(
+                children=[
+                    dbc.Card(
+                        children=[
+                            dbc.CardHeader(
+                                dbc.Row(
+                                    children=[
+                                        html.H5('Confirmed Cases', className='card-title', style={'text-align': 'center'}),
+                                        dbc.Popover(
+                                            children=[
+                                                dbc.PopoverHeader('Infection Map'),
+                                                dbc.PopoverBody('Area of the bubble is related to acumulative '
+                                                                'number of cases in the region / country. Hover over '
+                                                                'to see the actual numbers. Scroll to zoom in/out '
+                                                                'and double click to reset view.')
+                                            ],
+                                            id='map-popover',
+                                            is_open=False,
+                                            target='map-popover-target'
+                                        ),
+                                        dbc.Button('?', id='map-popover-target', className='button', color='info')
+                                    ],
+                                    align='center',
+                                    justify='between',
+                                    className='pl-2 pr-2'
+                            )),
+                            dbc.CardBody(
                                 children=[
-                                    html.H5('Confirmed Cases', className='card-title', style={'text-align': 'center'}),
-                                    dbc.Popover(
-                                        children=[
-                                            dbc.PopoverHeader('Infection Map'),
-                                            dbc.PopoverBody('Area of the bubble is related to acumulative '
-                                                            'number of cases in the region / country. Hover over '
-                                                            'to see the actual numbers. Scroll to zoom in/out '
-                                                            'and double click to reset view.')
-                                        ],
-                                        id='map-popover',
-                                        is_open=False,
-                                        target='map-popover-target'
-                                    ),
-                                    dbc.Button('?', id='map-popover-target', className='button', color='info')
+                                    dcc.Graph(
+                                        id='infection-map',
+                                        figure=map_figure,
+                                        config=dict(
+                                            displayModeBar=True
+                                        )
+                                )],
+                            )
+                        ]
+                    ),
+                    dbc.Card(
+                        children=[
+                            dbc.CardHeader(
+                                dbc.Row(
+                                    children=[
+                                        html.H5('The famous curve', className='card-title'),
+                                        dcc.Dropdown(
+                                            id='curve-metric',
+                                            options=[{'label': label, 'value': metric}
+                                                     for metric, (label, _) in derived.METRICS.items()],
+                                            value='cumulative',
+                                            clearable=False,
+                                            style={'width': '16rem'}
+                                        )
+                                    ],
+                                    align='center',
+                                    justify='between',
+                                    className='pl-2 pr-2'
+                            )),
+                            dbc.CardBody(
+                                children=[
+                                    dcc.Graph(
+                                        figure=curve_figure,
+                                        id='curve-scatter')
                                 ],
-                                align='center',
-                                justify='between',
-                                className='pl-2 pr-2'
-                        )),
-                        dbc.CardBody(
-                            children=[
-                                dcc.Graph(
-                                    id='infection-map',
-                                    figure=draw_infection_map(CONFIRMED, convert_date(DAYS[-7])),
-                                    config=dict(
-                                        displayModeBar=True
-                                    )
-                            )],
-                        )
-                    ]
-                ),
-                dbc.Card(
-                    children=[
-                        dbc.CardHeader(html.H5('The famous curve', className='card-title')),
-                        dbc.CardBody(
-                            children=[
-                                dcc.Graph(
-                                    figure=draw_curve(CONFIRMED, DEATHS, RECOVERED, list(CONFIRMED.columns)[-1]),
-                                    id='curve-scatter')
-                            ],
-                        )
-                    ]
-                )
-            ],
-)
-
-content = html.Div(
-    children=[
-        dashboard_nav,
-        dbc.Container(
-            children=[
-                kpi_row,
-                charts_deck
-            ],
-            fluid=True
-        )
-    ]
-)
-
-layout = html.Div(
-    children=[content, html.Div('TEST', id='debug', style={'height': '1000px'})]
-)
+                            )
+                        ]
+                    )
+                ],
+    )
+    return charts_deck
+
+
+def render_layout(days, countries, map_figure, curve_figure, data, version=None):
+    content = html.Div(
+        children=[
+            render_dashboard_nav(days, countries),
+            dbc.Container(
+                children=[
+                    kpi_row,
+                    render_charts_deck(map_figure, curve_figure)
+                ],
+                fluid=True
+            )
+        ]
+    )
 
+    layout = html.Div(
+        children=[
+            content,
+            html.Div('TEST', id='debug', style={'height': '1000px'}),
+            dcc.Store(id='dataset-version', data=version)
+        ]
+    )
 
-@app.callback(
-    [Output('infection-map', 'figure'),
-     Output('curve-scatter', 'figure')],
-    [Input('date-picker-single', 'date')]
-)
-def update_map(day):
-    date_only = day.split('T')[0]
-    return draw_infection_map(CONFIRMED, date_only), draw_curve(CONFIRMED, DEATHS, RECOVERED, date_only)
+    if CLIENTSIDE:
+        layout.children.extend([
+            dcc.Store(id='dashboard-data', data=data),
+            dcc.Store(id='date-step-clicks', data=[0, 0])
+        ])
+    if refresher.INTERVAL > 0:
+        # open pages pick up a refreshed dataset, see update_dataset
+        layout.children.append(dcc.Interval(id='dataset-poll', interval=int(refresher.INTERVAL * 1000)))
+    return layout
 
 
-@app.callback(
-    [Output(f'{covid_state}-total', 'children') for covid_state in COVID_STATES],
-    [Input('date-picker-single', 'date')]
-)
-def update_total(day):
-    date_only = day.split('T')[0]
-    return ['{:,.0f}'.format(np.sum(df[date_only]))
-            for df in ALL_DFS]
+def build_layout():
+    # only called on the first visit of the page, see pages.py
+    ds = dataset.current()
+    days = ds.cube.days
+    data = dashboard_data(ds) if CLIENTSIDE else None
+    return render_layout(days, ds.hierarchy.countries, draw_infection_map(ds, days[-7]),
+                         draw_curve(ds.cube, days[-1]), data, ds.version)
 
 
-@app.callback(
-    [Output(f'{covid_state}-change', 'children') for covid_state in COVID_STATES],
-    [Input('date-picker-single', 'date')]
-)
-def update_change(day):
-    date_only = day.split('T')[0]
-    selected_idx = [list(df.columns).index(date_only) for df in ALL_DFS]
-    results = [np.sum(df.iloc[:, idx]) - np.sum(df.iloc[:, idx-1])
-               for df, idx in zip(ALL_DFS, selected_idx)]
-    return ['{:+,.0f}'.format(result) for result in results]
+def validation_layout():
+    # the same components without any data, so validation doesn't load it
+    return render_layout([None], [], {}, {}, None)
 
 
 @app.callback(
@@ -320,24 +428,164 @@ def toggle_popover(n, is_open):
     return is_open
 
 
-@app.callback(
-    [Output('date-picker-single', 'date')],
-    [Input('previous-day-button', 'n_clicks'),
-     Input('next-day-button', 'n_clicks')],
-    [State('date-picker-single', 'date')]
-)
-def move_date(prev_day, next_day, current_date):
-    ctx = dash.callback_context
-    if ctx.triggered:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    # if prev_day is not None:
-        available_dates = list(STR_TO_DATE.values())
-        date_idx = available_dates.index(current_date)
+MAP_INPUTS = [Input('date-picker-single', 'date'), Input('country-select', 'value')]
+if MAP_LOD:
+    MAP_INPUTS.append(Input('infection-map', 'relayoutData'))
+
+    @app.callback(
+        Output('infection-map', 'relayoutData'),
+        [Input('country-select', 'value')]
+    )
+    def reset_map_view(country):
+        # a new country resets the zoom of the map, see the uirevision in
+        # draw_infection_map, so the last relayoutData no longer applies
+        return None
+
+
+def map_view(relayout_data, country=None):
+    # raises for relayouts that don't move the map, e.g. autosize
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    if not MAP_LOD or country or 'country-select.value' in triggered:
+        # a country zooms onto its regions, the map has all of them
+        view = None
+    else:
+        view = map_grid.parse_view(relayout_data)
+    if view is None and triggered == ['infection-map.relayoutData']:
+        raise PreventUpdate
+    return view, triggered
+
+
+if CLIENTSIDE:
+    @app.callback(
+        Output('infection-map', 'figure'),
+        MAP_INPUTS
+    )
+    def update_map(day, country, relayout_data=None):
+        date_only = day.split('T')[0]
+        view, triggered = map_view(relayout_data, country)
+        return figure_update('map', date_only, country=country, view=view,
+                             traces_only=data_only(triggered, MAP_LAYOUT_INPUTS))
+
+    @app.callback(
+        Output('dashboard-data', 'data'),
+        [Input('country-select', 'value'),
+         Input('curve-metric', 'value'),
+         Input('dataset-version', 'data')]
+    )
+    def update_dashboard_data(country, metric, version):
+        # the page is loaded with the global data already
+        if not dash.callback_context.triggered:
+            raise PreventUpdate
+        return dashboard_data(dataset.current(), country, metric)
+
+    app.clientside_callback(
+        ClientsideFunction('dashboard', 'update_curve'),
+        Output('curve-scatter', 'figure'),
+        [Input('date-picker-single', 'date'),
+         Input('dashboard-data', 'data')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction('dashboard', 'update_total'),
+        [Output(f'{covid_state}-total', 'children') for covid_state in COVID_STATES],
+        [Input('date-picker-single', 'date'),
+         Input('dashboard-data', 'data')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction('dashboard', 'update_change'),
+        [Output(f'{covid_state}-change', 'children') for covid_state in COVID_STATES],
+        [Input('date-picker-single', 'date'),
+         Input('dashboard-data', 'data')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction('dashboard', 'move_date'),
+        [Output('date-picker-single', 'date'),
+         Output('date-step-clicks', 'data')],
+        [Input('previous-day-button', 'n_clicks'),
+         Input('next-day-button', 'n_clicks')],
+        [State('date-picker-single', 'date'),
+         State('date-step-clicks', 'data'),
+         State('dashboard-data', 'data')]
+    )
+else:
+    @app.callback(
+        [Output('infection-map', 'figure'),
+         Output('curve-scatter', 'figure')],
+        MAP_INPUTS[:2] + [Input('curve-metric', 'value')] + MAP_INPUTS[2:]
+    )
+    def update_map(day, country, metric, relayout_data=None):
+        date_only = day.split('T')[0]
+        view, triggered = map_view(relayout_data, country)
+        ds = dataset.current()
+        # zooming and panning only change the map, the metric only the curve
+        if triggered == ['curve-metric.value']:
+            map_figure = dash.no_update
+        else:
+            map_figure = figure_update('map', date_only, ds, country, view,
+                                       traces_only=data_only(triggered, MAP_LAYOUT_INPUTS))
+        if triggered == ['infection-map.relayoutData']:
+            curve = dash.no_update
+        else:
+            curve = figure_update(curve_kind(metric), date_only, ds, country,
+                                  traces_only=data_only(triggered, CURVE_LAYOUT_INPUTS))
+        return map_figure, curve
+
+    @app.callback(
+        [Output(f'{covid_state}-total', 'children') for covid_state in COVID_STATES],
+        [Input('date-picker-single', 'date'),
+         Input('country-select', 'value')]
+    )
+    def update_total(day, country):
+        date_only = day.split('T')[0]
+        ds = dataset.current()
+        cube = country_cube(ds.hierarchy, ds.cube, country)
+        day_idx = cube.date_index[date_only]
+        return ['{:,.0f}'.format(total) for total in cube.totals[:, day_idx]]
+
+    @app.callback(
+        [Output(f'{covid_state}-change', 'children') for covid_state in COVID_STATES],
+        [Input('date-picker-single', 'date'),
+         Input('country-select', 'value')]
+    )
+    def update_change(day, country):
+        date_only = day.split('T')[0]
+        ds = dataset.current()
+        cube = country_cube(ds.hierarchy, ds.cube, country)
+        day_idx = cube.date_index[date_only]
+        return ['{:+,.0f}'.format(change) for change in cube.changes[:, day_idx]]
+
+    @app.callback(
+        [Output('date-picker-single', 'date')],
+        [Input('previous-day-button', 'n_clicks'),
+         Input('next-day-button', 'n_clicks')],
+        [State('date-picker-single', 'date')]
+    )
+    def move_date(prev_day, next_day, current_date):
+        ctx = dash.callback_context
+        button_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+        current_date = current_date.split('T')[0]
+        cube = dataset.current().cube
         if button_id == 'previous-day-button':
-            if date_idx - 1 >=0:
-                date_idx -= 1
+            return [step_day(cube, current_date, -1)]
         elif button_id == 'next-day-button':
-            if date_idx + 1 <= len(available_dates)-1:
-                date_idx += 1
+            return [step_day(cube, current_date, 1)]
+        return [current_date]
+
 
-    return [available_dates[date_idx]]
\ No newline at end of file
+if refresher.INTERVAL > 0:
+    @app.callback(
+        [Output('date-picker-single', 'min_date_allowed'),
+         Output('date-picker-single', 'max_date_allowed'),
+         Output('dataset-version', 'data')],
+        [Input('dataset-poll', 'n_intervals')],
+        [State('dataset-version', 'data')]
+    )
+    def update_dataset(n_intervals, version):
+        ds = dataset.current()
+        if ds.version == version:
+            raise PreventUpdate
+        days = ds.cube.days
+        # in CLIENTSIDE mode the new version also reloads the store, see update_dashboard_data
+        return days[0], days[-1], ds.version
@@ -0,0 +1,57 @@
+// Clientside callbacks of the daily dashboard, used when COVID_CLIENTSIDE=1.
+// All of them read from the 'dashboard-data' store which holds the days, the
+// global totals and daily changes per state and the full curve figure.
+
+function dayIndex(data, day) {
+    if (!day) {
+        return data.days.length - 1;
+    }
+    var idx = data.days.indexOf(day.split('T')[0]);
+    return idx < 0 ? data.days.length - 1 : idx;
+}
+
+function formatNumber(value, signed) {
+    var text = Math.round(value).toLocaleString('en-US');
+    return signed && value >= 0 ? '+' + text : text;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        move_date: function(prevClicks, nextClicks, currentDate, lastClicks, data) {
+            prevClicks = prevClicks || 0;
+            nextClicks = nextClicks || 0;
+            lastClicks = lastClicks || [0, 0];
+            var idx = dayIndex(data, currentDate);
+            if (prevClicks > lastClicks[0]) {
+                idx = Math.max(idx - 1, 0);
+            } else if (nextClicks > lastClicks[1]) {
+                idx = Math.min(idx + 1, data.days.length - 1);
+            }
+            return [data.days[idx], [prevClicks, nextClicks]];
+        },
+
+        update_total: function(day, data) {
+            var idx = dayIndex(data, day);
+            return data.totals.map(function(series) {
+                return formatNumber(series[idx], false);
+            });
+        },
+
+        update_change: function(day, data) {
+            var idx = dayIndex(data, day);
+            return data.changes.map(function(series) {
+                return formatNumber(series[idx], true);
+            });
+        },
+
+        update_curve: function(day, data) {
+            var idx = dayIndex(data, day);
+            var curve = data.curve;
+            return Object.assign({}, curve, {
+                data: curve.data.map(function(trace) {
+                    return Object.assign({}, trace, {y: trace.y.slice(0, idx + 1)});
+                })
+            });
+        }
+    }
+});
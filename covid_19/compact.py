@@ -0,0 +1,118 @@
+"""
+Opt-in compact encoding of figure payloads (COVID_COMPACT_FIGURES=1).
+
+Lat/long are rounded to COORD_PRECISION decimals, marker sizes to
+SIZE_PRECISION and whole numbers are sent as integers. With dash >= 2.15,
+whose plotly.js (>= 2.28) decodes typed arrays, the numeric trace arrays
+are sent as {'dtype', 'bdata'} with base64 little endian bytes: counts as
+int32, lat/long and marker sizes as float32. Older versions get plain
+lists of the same rounded values.
+
+Figures are serialized with orjson when it is installed. dash >= 2 sends
+callback responses through plotly's json engine, which enable_fast_json()
+switches to orjson; dash 1 always uses json.dumps with PlotlyJSONEncoder.
+Sending only the traces of a figure with dash.Patch needs dash >= 2.9.
+"""
+import base64
+import json
+import os
+import re
+
+import dash
+import numpy as np
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPACT = os.environ.get('COVID_COMPACT_FIGURES', '') == '1'
+COORD_PRECISION = int(os.environ.get('COVID_COORD_PRECISION', 3))
+SIZE_PRECISION = 1
+
+DASH_VERSION = tuple(int(part) for part in re.findall(r'\d+', dash.__version__)[:2])
+TYPED_ARRAYS = DASH_VERSION >= (2, 15)
+PLOTLY_JSON = DASH_VERSION >= (2, 0)
+
+INT32_MAX = np.iinfo(np.int32).max
+TYPED_ARRAY_CODES = {np.dtype('int32'): 'i4', np.dtype('float32'): 'f4', np.dtype('float64'): 'f8'}
+COORD_KEYS = ('lat', 'lon')
+VALUE_KEYS = ('x', 'y', 'z')
+
+
+def typed_array(values, dtype):
+    values = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {
+        'dtype': TYPED_ARRAY_CODES[values.dtype.newbyteorder('=')],
+        'bdata': base64.b64encode(values.tobytes()).decode('ascii')
+    }
+
+
+def encode_array(values, dtype):
+    if TYPED_ARRAYS:
+        return typed_array(values, dtype)
+    # the floats stay float64 in a list, so the rounded values print short
+    if np.dtype(dtype).kind == 'f':
+        dtype = np.float64
+    return np.asarray(values, dtype=dtype).tolist()
+
+
+def numeric_array(values):
+    if not isinstance(values, (list, tuple, np.ndarray)) or len(values) == 0:
+        return None
+    try:
+        values = np.asarray(values)
+    except ValueError:
+        return None
+    if values.dtype.kind not in 'iuf':
+        return None
+    return values
+
+
+def encode_values(values):
+    if values.dtype.kind in 'iu' or np.all(np.mod(values, 1) == 0):
+        if np.abs(values).max() <= INT32_MAX:
+            return encode_array(values, np.int32)
+    return encode_array(values, np.float64)
+
+
+def compact_trace(trace):
+    trace = dict(trace)
+    for key in COORD_KEYS:
+        values = numeric_array(trace.get(key))
+        if values is not None:
+            trace[key] = encode_array(np.round(values, COORD_PRECISION), np.float32)
+    for key in VALUE_KEYS:
+        values = numeric_array(trace.get(key))
+        if values is not None:
+            trace[key] = encode_values(values)
+    marker = trace.get('marker')
+    if isinstance(marker, dict):
+        sizes = numeric_array(marker.get('size'))
+        if sizes is not None:
+            trace['marker'] = dict(marker, size=encode_array(np.round(sizes, SIZE_PRECISION), np.float32))
+    return trace
+
+
+def compact_figure(fig):
+    fig = fig.to_dict() if hasattr(fig, 'to_dict') else dict(fig)
+    fig['data'] = [compact_trace(trace) for trace in fig.get('data', [])]
+    return fig
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(obj, cls=PlotlyJSONEncoder)
+
+
+def figure_json(fig):
+    return dumps(compact_figure(fig))
+
+
+def enable_fast_json():
+    # a no-op on dash 1, see the module docstring
+    if PLOTLY_JSON and orjson is not None and hasattr(pio, 'json') and hasattr(pio.json, 'config'):
+        pio.json.config.default_engine = 'orjson'
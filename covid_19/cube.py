@@ -0,0 +1,55 @@
+"""
+Global aggregates of the snapshot, computed once at load.
+
+totals[state, day] is the global number of cases of each COVID state on each
+day and changes[state, day] the difference to the previous day, so the KPI
+cards, the curve and the date navigation only index into these arrays.
+When days are appended to the snapshot, extend_cube() only sums the new
+columns.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from data_store import COVID_STATES
+
+Cube = namedtuple('Cube', ['version', 'days', 'date_index', 'totals', 'changes'])
+
+
+def build_cube(snapshot):
+    totals = np.stack([
+        np.asarray(snapshot.tables[covid_state].counts).sum(axis=0)
+        for covid_state in COVID_STATES
+    ])
+    # on the first day every case counts as new
+    changes = np.diff(totals, axis=1, prepend=0)
+    return Cube(
+        version=snapshot.version,
+        days=list(snapshot.days),
+        date_index={day: idx for idx, day in enumerate(snapshot.days)},
+        totals=totals,
+        changes=changes
+    )
+
+
+def extend_cube(cube, snapshot):
+    start = len(cube.days)
+    if list(snapshot.days[:start]) != cube.days:
+        raise ValueError('The snapshot does not extend the days of the cube')
+    new_totals = np.stack([
+        np.asarray(snapshot.tables[covid_state].counts[:, start:]).sum(axis=0)
+        for covid_state in COVID_STATES
+    ])
+    new_changes = np.diff(new_totals, axis=1, prepend=cube.totals[:, -1:] if start else 0)
+    return Cube(
+        version=snapshot.version,
+        days=list(snapshot.days),
+        date_index={day: idx for idx, day in enumerate(snapshot.days)},
+        totals=np.concatenate([cube.totals, new_totals], axis=1),
+        changes=np.concatenate([cube.changes, new_changes], axis=1)
+    )
+
+
+def step_day(cube, day, step):
+    idx = min(max(cube.date_index[day] + step, 0), len(cube.days) - 1)
+    return cube.days[idx]
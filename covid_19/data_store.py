@@ -0,0 +1,250 @@
+"""
+Local snapshot store for the COVID-19 time series.
+
+The three source CSVs (Confirmed, Deaths, Recovered) are read once, the date
+headers are converted to ISO format and the counts are written as .npy
+matrices next to a JSON metadata sidecar. Every snapshot lives in its own
+version directory and the CURRENT file points at the active one, so loading
+is a memory map of a few arrays and the network is only touched when a
+refresh is asked for.
+
+Refresh from the command line:
+
+    python data_store.py --source https://... (or a local directory)
+"""
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+COVID_STATES = ['Confirmed', 'Deaths', 'Recovered']
+ID_COLUMNS = ['Province/State', 'Country/Region', 'Lat', 'Long']
+
+SOURCE_URL = 'https://raw.githubusercontent.com/bumbeishvili/covid19-daily-data/master/'
+SOURCE_FILE = 'time_series_19-covid-{}.csv'
+
+SNAPSHOT_DIR = os.environ.get(
+    'COVID_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+)
+DATA_SOURCE = os.environ.get('COVID_DATA_SOURCE', SOURCE_URL)
+REFRESH = os.environ.get('COVID_REFRESH', '') == '1'
+
+# number of old snapshot versions kept next to the current one
+KEEP_VERSIONS = 2
+
+Table = namedtuple('Table', ['province', 'country', 'lat', 'long', 'counts'])
+Snapshot = namedtuple('Snapshot', ['version', 'days', 'source_days', 'tables'])
+
+
+def convert_date(str_date):
+    str_to_date = dt.datetime.strptime(str_date, '%m/%d/%y')
+    date_to_str = dt.datetime.strftime(str_to_date, '%Y-%m-%d')
+    return date_to_str
+
+
+def source_path(source, covid_state):
+    file_name = SOURCE_FILE.format(covid_state)
+    if source.startswith(('http://', 'https://')):
+        return source.rstrip('/') + '/' + file_name
+    return os.path.join(source, file_name)
+
+
+def read_source(source=DATA_SOURCE):
+    return [pd.read_csv(source_path(source, covid_state)) for covid_state in COVID_STATES]
+
+
+def read_source_days(source, source_days):
+    # only the region columns and the given days, for an incremental refresh
+    columns = ID_COLUMNS + list(source_days)
+    return [pd.read_csv(source_path(source, covid_state), usecols=columns)[columns]
+            for covid_state in COVID_STATES]
+
+
+def published_days(source=DATA_SOURCE):
+    # the header is enough to know whether new days were published
+    return list(pd.read_csv(source_path(source, COVID_STATES[0]), nrows=0).columns)[4:]
+
+
+def source_counts(df, source_days):
+    return np.ascontiguousarray(df[source_days].fillna(0).to_numpy(dtype=np.int64))
+
+
+def snapshot_version(source_days, tables):
+    digest = hashlib.sha1(json.dumps(source_days).encode())
+    for covid_state in COVID_STATES:
+        digest.update(np.ascontiguousarray(tables[covid_state].counts).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def build_snapshot(dfs):
+    source_days = list(dfs[0].columns)[4:]
+    for covid_state, df in zip(COVID_STATES, dfs):
+        if list(df.columns)[4:] != source_days:
+            raise ValueError(f'{covid_state} does not have the same date columns as {COVID_STATES[0]}')
+
+    tables = {}
+    for covid_state, df in zip(COVID_STATES, dfs):
+        tables[covid_state] = Table(
+            province=[None if pd.isna(p) else str(p) for p in df['Province/State']],
+            country=[str(c) for c in df['Country/Region']],
+            lat=df['Lat'].to_numpy(dtype=np.float64),
+            long=df['Long'].to_numpy(dtype=np.float64),
+            counts=source_counts(df, source_days)
+        )
+
+    return Snapshot(
+        version=snapshot_version(source_days, tables),
+        days=[convert_date(day) for day in source_days],
+        source_days=source_days,
+        tables=tables
+    )
+
+
+def extend_snapshot(snapshot, dfs):
+    # appends the day columns of dfs, which have to list the same regions in
+    # the same order, the existing counts are copied but not parsed again
+    new_days = list(dfs[0].columns)[4:]
+    source_days = snapshot.source_days + new_days
+    tables = {}
+    for covid_state, df in zip(COVID_STATES, dfs):
+        table = snapshot.tables[covid_state]
+        if list(df.columns)[4:] != new_days:
+            raise ValueError(f'{covid_state} does not have the same date columns as {COVID_STATES[0]}')
+        province = [None if pd.isna(p) else str(p) for p in df['Province/State']]
+        country = [str(c) for c in df['Country/Region']]
+        if province != list(table.province) or country != list(table.country):
+            raise ValueError(f'The regions of {covid_state} changed')
+        tables[covid_state] = table._replace(
+            counts=np.concatenate([np.asarray(table.counts), source_counts(df, new_days)], axis=1)
+        )
+
+    return Snapshot(
+        version=snapshot_version(source_days, tables),
+        days=snapshot.days + [convert_date(day) for day in new_days],
+        source_days=source_days,
+        tables=tables
+    )
+
+
+def same_regions(snapshot, other):
+    return all(
+        list(snapshot.tables[covid_state].province) == list(other.tables[covid_state].province)
+        and list(snapshot.tables[covid_state].country) == list(other.tables[covid_state].country)
+        for covid_state in COVID_STATES
+    )
+
+
+def extends(snapshot, previous):
+    # snapshot lists the regions and the days of previous, and maybe more days
+    return (
+        same_regions(snapshot, previous)
+        and list(snapshot.days[:len(previous.days)]) == list(previous.days)
+    )
+
+
+def write_snapshot(snapshot, snapshot_dir=SNAPSHOT_DIR):
+    path = version_dir(snapshot.version, snapshot_dir)
+    if not os.path.isdir(path):
+        tmp_dir = f'{path}.tmp-{os.getpid()}'
+        os.makedirs(tmp_dir, exist_ok=True)
+        meta = {
+            'version': snapshot.version,
+            'days': snapshot.days,
+            'source_days': snapshot.source_days,
+            'regions': {}
+        }
+        for covid_state, table in snapshot.tables.items():
+            name = covid_state.lower()
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), table.counts)
+            np.save(os.path.join(tmp_dir, f'{name}_coords.npy'), np.column_stack([table.lat, table.long]))
+            meta['regions'][covid_state] = {'province': table.province, 'country': table.country}
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.replace(tmp_dir, path)
+        except OSError:
+            # another process wrote the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    # CURRENT is swapped atomically so readers never see a half written snapshot
+    pointer = os.path.join(snapshot_dir, 'CURRENT')
+    with open(f'{pointer}.tmp-{os.getpid()}', 'w') as f:
+        f.write(snapshot.version)
+    os.replace(f'{pointer}.tmp-{os.getpid()}', pointer)
+    prune_versions(snapshot_dir, snapshot.version)
+    return path
+
+
+def prune_versions(snapshot_dir, active_version, keep=KEEP_VERSIONS):
+    versions = [
+        entry for entry in os.scandir(snapshot_dir)
+        if entry.is_dir() and entry.name != active_version and '.tmp-' not in entry.name
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def current_version(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(version, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, version)
+
+
+def read_snapshot(snapshot_dir=SNAPSHOT_DIR, version=None, mmap_mode='r'):
+    version = version or current_version(snapshot_dir)
+    if version is None:
+        raise FileNotFoundError(f'No snapshot found in {snapshot_dir}')
+    path = version_dir(version, snapshot_dir)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    tables = {}
+    for covid_state in COVID_STATES:
+        name = covid_state.lower()
+        coords = np.load(os.path.join(path, f'{name}_coords.npy'), mmap_mode=mmap_mode)
+        tables[covid_state] = Table(
+            province=meta['regions'][covid_state]['province'],
+            country=meta['regions'][covid_state]['country'],
+            lat=coords[:, 0],
+            long=coords[:, 1],
+            counts=np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+        )
+    return Snapshot(meta['version'], meta['days'], meta['source_days'], tables)
+
+
+def refresh(source=DATA_SOURCE, snapshot_dir=SNAPSHOT_DIR):
+    snapshot = build_snapshot(read_source(source))
+    write_snapshot(snapshot, snapshot_dir)
+    return snapshot.version
+
+
+def load(source=DATA_SOURCE, snapshot_dir=SNAPSHOT_DIR, refresh_data=REFRESH):
+    # the source is only read when asked to, or when there is no snapshot yet
+    if refresh_data or current_version(snapshot_dir) is None:
+        refresh(source, snapshot_dir)
+    return read_snapshot(snapshot_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh the local COVID-19 snapshot.')
+    parser.add_argument('--source', default=DATA_SOURCE,
+                        help='base url or local directory holding the time series csv files')
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    print(refresh(args.source, args.snapshot_dir))
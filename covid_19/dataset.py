@@ -0,0 +1,104 @@
+"""
+The dataset the dashboard pages work on.
+
+Nothing is loaded at import time, the snapshot is read and the aggregates
+are built the first time current() is called. Listeners registered with
+on_load() are called with every dataset that becomes current.
+
+Under a pre-fork server the master calls preload() and every worker calls
+notify() after the fork: the workers share the memory mapped counts and the
+aggregates built by the master, and the listeners (which may start threads)
+run in the workers only.
+
+A dataset is never modified. A refresh builds the next one with
+next_dataset(), reusing what doesn't depend on the new days, and swap()
+makes it current, so a callback keeps working on the dataset it started
+with and every cache keyed on the version moves on with the swap.
+"""
+import threading
+from collections import namedtuple
+
+import data_store
+from cube import build_cube, extend_cube
+from derived import build_metrics, extend_metrics
+from hierarchy import build_hierarchy, extend_hierarchy
+from map_grid import build_grid
+from map_traces import region_labels
+
+Dataset = namedtuple('Dataset', ['version', 'snapshot', 'cube', 'hierarchy', 'metrics', 'map_labels', 'map_grid'])
+
+_LOCK = threading.Lock()
+_CURRENT = None
+_LISTENERS = []
+
+
+def build_dataset(snapshot):
+    cube = build_cube(snapshot)
+    hierarchy = build_hierarchy(snapshot)
+    return Dataset(
+        version=snapshot.version,
+        snapshot=snapshot,
+        cube=cube,
+        hierarchy=hierarchy,
+        metrics=build_metrics(cube, hierarchy),
+        map_labels=region_labels(snapshot.tables['Confirmed']),
+        map_grid=build_grid(snapshot.tables['Confirmed'])
+    )
+
+
+def next_dataset(ds, snapshot):
+    # only the new days are aggregated when the snapshot extends the dataset
+    if data_store.extends(snapshot, ds.snapshot):
+        start = len(ds.cube.days)
+        cube = extend_cube(ds.cube, snapshot)
+        hierarchy = extend_hierarchy(ds.hierarchy, snapshot, start)
+        return Dataset(
+            version=snapshot.version,
+            snapshot=snapshot,
+            cube=cube,
+            hierarchy=hierarchy,
+            metrics=extend_metrics(ds.metrics, cube, hierarchy, start),
+            map_labels=ds.map_labels,
+            map_grid=ds.map_grid
+        )
+    return build_dataset(snapshot)
+
+
+def current():
+    global _CURRENT
+    if _CURRENT is None:
+        with _LOCK:
+            if _CURRENT is None:
+                _CURRENT = build_dataset(data_store.load())
+                for listener in _LISTENERS:
+                    listener(_CURRENT)
+    return _CURRENT
+
+
+def preload():
+    global _CURRENT
+    with _LOCK:
+        if _CURRENT is None:
+            _CURRENT = build_dataset(data_store.load())
+    return _CURRENT
+
+
+def notify():
+    if _CURRENT is not None:
+        for listener in _LISTENERS:
+            listener(_CURRENT)
+
+
+def swap(ds):
+    global _CURRENT
+    with _LOCK:
+        _CURRENT = ds
+    notify()
+
+
+def is_loaded():
+    return _CURRENT is not None
+
+
+def on_load(listener):
+    _LISTENERS.append(listener)
@@ -0,0 +1,86 @@
+"""
+Derived series of the cumulative counts: daily new cases, 7-day average,
+growth rate and doubling time.
+
+derive() works on any array with the days on its last axis, so the global
+totals (state x day), the countries (state x country x day) and the regions
+of a table (region x day) go through the same NumPy pass. Every metric of a
+day only reads the WINDOW days before it, so when days are appended only
+the new columns are computed, from the cumulative counts of the last WINDOW
+days. The global and country series are built with the dataset. The
+regions only get the 7-day average of the days the map shows, in its hover
+text, computed from the counts of the day and of a week before, so no
+region x day series is kept.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+WINDOW = 7
+
+Derived = namedtuple('Derived', ['new', 'average', 'growth', 'doubling'])
+DatasetMetrics = namedtuple('DatasetMetrics', ['total', 'countries'])
+
+# label and axis title of the series the curve can show
+METRICS = {
+    'cumulative': ('Cumulative cases', 'Number of Cases'),
+    'new': ('Daily new cases', 'New Cases'),
+    'average': ('7-day average of new cases', 'New Cases (7-day average)'),
+    'growth': ('Growth rate', 'Daily Growth Rate'),
+    'doubling': ('Doubling time', 'Doubling Time (days)'),
+}
+
+def lagged(cumulative, lag):
+    # zero before the first day
+    out = np.zeros_like(cumulative)
+    out[..., lag:] = cumulative[..., :-lag]
+    return out
+
+
+def derive(cumulative, start=0):
+    # the metrics of the days from start on
+    first = max(start - WINDOW, 0)
+    cum = np.asarray(cumulative, dtype=np.float64)[..., first:]
+    week = lagged(cum, WINDOW)
+    days = np.minimum(np.arange(first, first + cum.shape[-1]) + 1, WINDOW)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = cum / week
+        # daily rate compounding over the window, and the days it takes to double at that rate
+        growth = np.where(week > 0, ratio ** (1 / WINDOW) - 1, np.nan)
+        doubling = np.where((week > 0) & (cum > week), WINDOW * np.log(2) / np.log(ratio), np.nan)
+    metrics = (cum - lagged(cum, 1), (cum - week) / days, growth, doubling)
+    return Derived(*(metric[..., start - first:] for metric in metrics))
+
+
+def extend(derived, cumulative, start):
+    new = derive(cumulative, start)
+    return Derived(*(np.concatenate([old, added], axis=-1) for old, added in zip(derived, new)))
+
+
+def build_metrics(cube, hierarchy):
+    return DatasetMetrics(total=derive(cube.totals), countries=derive(hierarchy.totals))
+
+
+def extend_metrics(metrics, cube, hierarchy, start):
+    return DatasetMetrics(
+        total=extend(metrics.total, cube.totals, start),
+        countries=extend(metrics.countries, hierarchy.totals, start)
+    )
+
+
+def curve_series(ds, metric, country=None):
+    # state x day
+    if metric == 'cumulative':
+        series = ds.cube.totals if country is None else ds.hierarchy.totals
+    else:
+        series = getattr(ds.metrics.total if country is None else ds.metrics.countries, metric)
+    return series if country is None else series[:, ds.hierarchy.country_index[country]]
+
+
+def region_average(counts, day_idxs):
+    # region x selected day 7-day average of new cases, the average of
+    # derive() read straight from the cumulative counts of those days
+    counts = np.asarray(counts)
+    day_idxs = np.asarray(day_idxs, dtype=np.intp)
+    week = np.where(day_idxs >= WINDOW, counts[:, day_idxs - WINDOW], 0)
+    return (counts[:, day_idxs] - week) / np.minimum(day_idxs + 1, WINDOW)
@@ -0,0 +1,120 @@
+"""
+Memoization of plotly figures keyed by (dataset version, day, figure kind).
+
+Figures are stored as serialized JSON in an LRU bounded by the total size of
+the stored strings. A hit only costs a json.loads, which is much cheaper than
+building and validating a go.Figure. The LRU class itself takes any payload
+with a len(), http_cache.py keeps compressed responses in it. prewarm() fills the cache from the most
+recent day back, from a background thread after startup, as long as the
+figures fit.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class LRU:
+    """Payloads of any type with a len(), evicted least recently used first
+    once their lengths add up to more than max_bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        payload = self.lookup(key)
+        if payload is not None:
+            return payload
+        with self._lock:
+            self.misses += 1
+
+        # built outside the lock, two threads may race on the same key which
+        # only costs a duplicate build
+        payload = build()
+        self.put(key, payload)
+        return payload
+
+    def lookup(self, key):
+        # None when the key isn't cached
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            if len(payload) > self.max_bytes:
+                return
+            self._entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class FigureCache(LRU):
+    """Figures stored as their serialized JSON, get() returns them decoded."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, encode=None):
+        super().__init__(max_bytes)
+        self.encode = encode or (lambda fig: pio.to_json(fig, validate=False))
+
+    def get(self, key, build):
+        return json.loads(self.get_json(key, build))
+
+    def get_json(self, key, build):
+        return super().get(key, lambda: self.encode(build()))
+
+
+def prewarm(cache, version, days, builders):
+    def run():
+        # most recent days first, they are the ones users look at. It stops
+        # before the cache is full: the LRU would evict the figures inserted
+        # first, the recent ones, and every older day built after that would
+        # be evicted again
+        largest = 0
+        for day in reversed(days):
+            for kind, build in builders.items():
+                key = (version, day, kind)
+                if key not in cache:
+                    if cache.size + largest > cache.max_bytes:
+                        return
+                    largest = max(largest, len(cache.get_json(key, lambda: build(day))))
+
+    thread = threading.Thread(target=run, name='figure-cache-prewarm', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,60 @@
+"""
+Disk cache of the infection map animation frames.
+
+Frames are built once per dataset version and day stride and written as
+gzipped JSON inside the snapshot's version directory, so they are cleaned up
+together with the snapshot. Frame rate only changes the animation controls,
+which are cheap to rebuild, so it is not part of the cache key.
+"""
+import gzip
+import json
+import os
+import threading
+
+import plotly.io as pio
+
+import data_store
+
+_LOCK = threading.Lock()
+_LOADED = {}
+
+
+def frames_path(version, day_stride, snapshot_dir=data_store.SNAPSHOT_DIR):
+    return os.path.join(data_store.version_dir(version, snapshot_dir), f'animation-stride{day_stride}.json.gz')
+
+
+def stride_days(days, day_stride):
+    selected = list(days[::day_stride])
+    # always end the animation on the most recent day
+    if selected[-1] != days[-1]:
+        selected.append(days[-1])
+    return selected
+
+
+def write_frames(path, payload):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def load_frames(version, day_stride, build, snapshot_dir=data_store.SNAPSHOT_DIR):
+    key = (version, day_stride)
+    with _LOCK:
+        if key in _LOADED:
+            return _LOADED[key]
+
+        path = frames_path(version, day_stride, snapshot_dir)
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                animation = json.load(f)
+        else:
+            payload = pio.to_json(build(day_stride), validate=False)
+            write_frames(path, payload)
+            animation = json.loads(payload)
+
+        # keep only the current version in memory
+        for loaded_key in [k for k in _LOADED if k[0] != version]:
+            del _LOADED[loaded_key]
+        _LOADED[key] = animation
+        return animation
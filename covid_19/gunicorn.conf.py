@@ -0,0 +1,39 @@
+"""
+Gunicorn settings for wsgi.py, see its docstring.
+"""
+import gc
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = os.environ.get('BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+# the dataset is loaded by the master, not once per worker
+preload_app = True
+
+# the theme is served from assets/ instead of the CDN, it is vendored here on
+# the first start, before the app is loaded and decides which one to link.
+# Without network access VENDOR_THEMES_SOURCE points at local theme files,
+# VENDOR_THEMES=0 skips the step, see tools/vendor_themes.py
+if os.environ.get('VENDOR_THEMES', '1') == '1':
+    vendor_command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools',
+                                                   'vendor_themes.py'), '--missing', '--apps', 'covid_19']
+    if os.environ.get('VENDOR_THEMES_SOURCE'):
+        vendor_command += ['--source', os.environ['VENDOR_THEMES_SOURCE']]
+    if subprocess.run(vendor_command).returncode != 0:
+        print('Could not vendor the theme, the CDN theme is linked', file=sys.stderr)
+
+
+def when_ready(server):
+    # the objects built by the master are never collected, so the workers
+    # don't dirty their copy on write pages by walking them
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # threads don't survive the fork, the load listeners (figure prewarming)
+    # start in every worker
+    import dataset
+    dataset.notify()
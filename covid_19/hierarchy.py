@@ -0,0 +1,89 @@
+"""
+Country -> province aggregation of the snapshot, computed once at load.
+
+The regions of every table are sorted by country, so the provinces of a
+country are the slice order[offsets[c]:offsets[c + 1]] of its table and
+totals[state, c, day] holds the sums per country. Selecting a country is an
+index into these arrays, country_cube() gives the same view of a country as
+the global Cube does, so the KPI cards and the curve don't change.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from cube import Cube
+from data_store import COVID_STATES
+
+Hierarchy = namedtuple('Hierarchy', ['countries', 'country_index', 'rows', 'totals', 'changes'])
+# order and offsets of the regions of one table, by country
+Rows = namedtuple('Rows', ['order', 'offsets'])
+
+
+def country_rows(countries, table_countries):
+    codes = np.searchsorted(countries, np.asarray(table_countries, dtype=object))
+    order = np.argsort(codes, kind='stable')
+    offsets = np.searchsorted(codes[order], np.arange(len(countries) + 1))
+    return Rows(order=order, offsets=offsets)
+
+
+def country_sums(rows, counts):
+    # one reduceat over the regions sorted by country, countries without a
+    # region in this table stay zero
+    sums = np.zeros((len(rows.offsets) - 1, counts.shape[1]), dtype=np.int64)
+    present = np.flatnonzero(np.diff(rows.offsets))
+    if len(present):
+        sums[present] = np.add.reduceat(np.asarray(counts)[rows.order], rows.offsets[present], axis=0)
+    return sums
+
+
+def build_hierarchy(snapshot):
+    countries = np.array(sorted({
+        country for covid_state in COVID_STATES for country in snapshot.tables[covid_state].country
+    }), dtype=object)
+    rows = {
+        covid_state: country_rows(countries, snapshot.tables[covid_state].country)
+        for covid_state in COVID_STATES
+    }
+    totals = np.stack([
+        country_sums(rows[covid_state], snapshot.tables[covid_state].counts)
+        for covid_state in COVID_STATES
+    ])
+    return Hierarchy(
+        countries=countries.tolist(),
+        country_index={country: idx for idx, country in enumerate(countries)},
+        rows=rows,
+        totals=totals,
+        changes=np.diff(totals, axis=2, prepend=0)
+    )
+
+
+def extend_hierarchy(hierarchy, snapshot, start):
+    # the regions didn't change, only the days from start on are summed
+    new_totals = np.stack([
+        country_sums(hierarchy.rows[covid_state], snapshot.tables[covid_state].counts[:, start:])
+        for covid_state in COVID_STATES
+    ])
+    new_changes = np.diff(new_totals, axis=2, prepend=hierarchy.totals[:, :, -1:] if start else 0)
+    return hierarchy._replace(
+        totals=np.concatenate([hierarchy.totals, new_totals], axis=2),
+        changes=np.concatenate([hierarchy.changes, new_changes], axis=2)
+    )
+
+
+def province_rows(hierarchy, covid_state, country):
+    rows = hierarchy.rows[covid_state]
+    idx = hierarchy.country_index[country]
+    return rows.order[rows.offsets[idx]:rows.offsets[idx + 1]]
+
+
+def country_cube(hierarchy, cube, country):
+    if country is None:
+        return cube
+    idx = hierarchy.country_index[country]
+    return Cube(
+        version=cube.version,
+        days=cube.days,
+        date_index=cube.date_index,
+        totals=hierarchy.totals[:, idx, :],
+        changes=hierarchy.changes[:, idx, :]
+    )
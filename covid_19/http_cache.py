@@ -0,0 +1,161 @@
+"""
+Compression and caching of the HTTP responses of the Dash server.
+
+install(server) adds to every response:
+
+- gzip, or brotli when the brotli package is installed and the client
+  accepts it, for text and JSON bodies of at least HTTP_COMPRESS_MIN_BYTES.
+  Compressed bodies are kept in an LRU keyed by the hash of the body, so
+  the layout, the dependencies and the component bundles are compressed
+  once and not on every request.
+- a weak ETag on _dash-layout and _dash-dependencies, a matching
+  If-None-Match is answered with 304 Not Modified.
+- an immutable Cache-Control on the files of assets/: Dash links them with
+  their modification time in the query string, the vendored theme and its
+  fonts carry a hash of their content in the name (tools/vendor_themes.py).
+- for _dash-update-component, which browsers never cache being a POST, a
+  server side cache of the responses keyed by the dataset version and the
+  request body (HTTP_CALLBACK_CACHE_MB, 0 turns it off). The callbacks of
+  the app only depend on their inputs and on the dataset, so a repeated
+  request skips the callback, the serialization and the compression. The
+  name of the callback is kept with the response, so the metrics of
+  metrics.py count the hits, labelled cache="hit".
+"""
+import gzip
+import hashlib
+import os
+import re
+
+import flask
+
+from figure_cache import LRU
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_BYTES = int(os.environ.get('HTTP_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSED_CACHE_MB = int(os.environ.get('HTTP_COMPRESSED_CACHE_MB', 32))
+CALLBACK_CACHE_MB = int(os.environ.get('HTTP_CALLBACK_CACHE_MB', 32))
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+ETAG_PATHS = ('_dash-layout', '_dash-dependencies')
+CALLBACK_PATH = '_dash-update-component'
+ASSETS_PATH = '/assets/'
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def accepted_encoding(request):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def compressible(response):
+    return (
+        response.status_code == 200
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def immutable_asset(request):
+    return request.path.startswith(ASSETS_PATH) and ('m' in request.args or FINGERPRINT_RE.search(request.path))
+
+
+def cache_assets(server):
+    @server.after_request
+    def immutable_assets(response):
+        if immutable_asset(flask.request) and response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+class CachedResponse:
+    # sized by its body in the LRU
+    __slots__ = ('body', 'callback')
+
+    def __init__(self, body, callback):
+        self.body = body
+        self.callback = callback
+
+    def __len__(self):
+        return len(self.body)
+
+
+def install(server, version=lambda: None):
+    compressed = LRU(COMPRESSED_CACHE_MB * 1024 * 1024)
+    callbacks = LRU(CALLBACK_CACHE_MB * 1024 * 1024)
+
+    cache_assets(server)
+
+    @server.before_request
+    def cached_callback():
+        request = flask.request
+        if not CALLBACK_CACHE_MB or request.method != 'POST' or not request.path.endswith(CALLBACK_PATH):
+            return None
+        # the key is taken once, before the callback runs, so a response is
+        # stored under the version it was computed with even if the dataset
+        # is swapped in the meantime
+        body = request.get_data(cache=True)
+        flask.g.callback_key = (version(), hashlib.sha1(body).hexdigest())
+        flask.g.dash_callback_cache = 'miss'
+        # small responses are stored uncompressed
+        for encoding in {accepted_encoding(request), None}:
+            cached = callbacks.lookup(flask.g.callback_key + (encoding,))
+            if cached is not None:
+                flask.g.dash_callback = cached.callback
+                flask.g.dash_callback_cache = 'hit'
+                response = flask.Response(cached.body, mimetype='application/json')
+                if encoding is not None:
+                    response.headers['Content-Encoding'] = encoding
+                response.headers['Vary'] = 'Accept-Encoding'
+                response.headers['X-Callback-Cache'] = 'hit'
+                return response
+        return None
+
+    @server.after_request
+    def compress_response(response):
+        request = flask.request
+        if response.headers.get('X-Callback-Cache') == 'hit':
+            return response
+        path = request.path
+        if request.method == 'GET' and path.endswith(ETAG_PATHS) and response.status_code == 200:
+            response.add_etag(weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.make_conditional(request)
+        if not compressible(response):
+            return response
+
+        body = response.get_data()
+        encoding = accepted_encoding(request)
+        if encoding is not None and len(body) >= MIN_BYTES:
+            digest = hashlib.sha1(body).hexdigest()
+            body = compressed.get((encoding, digest), lambda: compress(body, encoding))
+            response.set_data(body)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            encoding = None
+        response.headers.add('Vary', 'Accept-Encoding')
+
+        key = flask.g.get('callback_key')
+        if key is not None:
+            callbacks.put(key + (encoding,), CachedResponse(body, flask.g.get('dash_callback')))
+        return response
+
+    return compressed, callbacks
@@ -6,6 +6,9 @@ import dash_bootstrap_components as dbc
 import flask
 from app import app
 from apps import about, daily_dashboard, animations
+from pages import register_page, page_layout, validation_layouts, invalidate
+import dataset
+import refresher
 
 SIDEBAR_STYLE = {
     "position": "fixed",
@@ -23,6 +26,15 @@ CONTENT_STYLE = {
 
 PAGES = ['about', 'daily-dashboard', 'animations']
 
+# layouts are built on the first visit of each page, see pages.py
+register_page('about', lambda: about.layout)
+register_page('daily-dashboard', daily_dashboard.build_layout, daily_dashboard.validation_layout)
+register_page('animations', lambda: animations.layout)
+# the dashboard layout carries the dates and figures of one dataset version
+dataset.on_load(lambda ds: invalidate('daily-dashboard'))
+# polls the source with COVID_REFRESH_INTERVAL, started with the first dataset
+dataset.on_load(refresher.ensure_started)
+
 sidebar = html.Div(
     [
         html.H2("Sidebar", className="display-4"),
@@ -55,11 +67,7 @@ url_bar_and_content_div = html.Div([
 def serve_layout():
     if flask.has_request_context():
         return url_bar_and_content_div
-    return html.Div([
-        url_bar_and_content_div,
-        about.layout,
-        daily_dashboard.layout
-    ])
+    return html.Div([url_bar_and_content_div] + validation_layouts())
 
 
 app.layout = serve_layout
@@ -84,12 +92,11 @@ def toggle_active_links(pathname):
     Output("page-content", "children"),
     [Input("url", "pathname")])
 def render_page_content(pathname):
-    if pathname in ["/", "/about"]:
-        return about.layout
-    elif pathname == "/daily-dashboard":
-        return daily_dashboard.layout
-    elif pathname == "/animations":
-        return animations.layout
+    if pathname == "/":
+        pathname = "/about"
+    layout = page_layout((pathname or "").strip("/"))
+    if layout is not None:
+        return layout
     # If the user tries to reach a different page, return a 404 message
     return dbc.Jumbotron(
         [
@@ -0,0 +1,113 @@
+"""
+Level of detail for the infection map (COVID_MAP_LOD=1).
+
+build_grid() bins the regions of a table into grids of LEVEL_SIZES degrees
+once per dataset, every cell placed at the centroid of its regions. A map
+trace sums the counts of a day per cell with one bincount, and uses the
+finest level that keeps at most MAX_POINTS markers around the viewport
+read from the relayoutData of the graph, the regions themselves once
+zoomed in far enough. Only the cells around the viewport are sent.
+"""
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from map_traces import MARKER_COLOR, SIZE_SCALE, hover_text
+
+# cell sizes in degrees, coarse to fine, the regions come after the last one
+LEVEL_SIZES = (20.0, 10.0, 5.0, 2.0, 1.0, 0.5)
+MAX_POINTS = int(os.environ.get('COVID_MAP_MAX_POINTS', 2000))
+# cells within this many viewports around the visible one are sent, so a
+# short pan doesn't show an empty map until the next response
+VIEW_MARGIN = 1.0
+
+Level = namedtuple('Level', ['size', 'cells', 'lat', 'lon'])
+View = namedtuple('View', ['scale', 'lat', 'lon'])
+WORLD = View(1.0, 0.0, 0.0)
+
+
+def build_level(lat, lon, size):
+    if not size:
+        return Level(size=0.0, cells=np.arange(len(lat)), lat=lat, lon=lon)
+    keys = np.floor(lat / size).astype(np.int64) * 100000 + np.floor(lon / size).astype(np.int64)
+    _, cells, regions = np.unique(keys, return_inverse=True, return_counts=True)
+    return Level(
+        size=size,
+        cells=cells,
+        lat=np.bincount(cells, weights=lat) / regions,
+        lon=np.bincount(cells, weights=lon) / regions
+    )
+
+
+def build_grid(table):
+    lat = np.asarray(table.lat, dtype=np.float64)
+    lon = np.asarray(table.long, dtype=np.float64)
+    return [build_level(lat, lon, size) for size in LEVEL_SIZES + (0.0,)]
+
+
+def parse_view(relayout_data):
+    # snapped to steps of sqrt(2) in scale and a quarter of the visible span
+    # in position, so nearby views share their cached figures
+    if not relayout_data:
+        return None
+    scale = relayout_data.get('geo.projection.scale')
+    lat = relayout_data.get('geo.center.lat')
+    lon = relayout_data.get('geo.center.lon')
+    if scale is None and lat is None and lon is None:
+        return None
+    scale = 2 ** (round(2 * math.log2(max(float(scale or 1), 1.0))) / 2)
+    step = 45 / scale
+    return View(scale, round(float(lat or 0) / step) * step, round(float(lon or 0) / step) * step)
+
+
+def view_mask(level, view, margin):
+    lat_span = 90 / view.scale * (1 + 2 * margin)
+    lon_span = 180 / view.scale * (1 + 2 * margin)
+    lon_offset = (level.lon - view.lon + 180) % 360 - 180
+    return (np.abs(level.lat - view.lat) <= lat_span) & (np.abs(lon_offset) <= lon_span)
+
+
+def grid_trace(grid, table, day_idx, labels, view=None, rows=None, color=MARKER_COLOR, average=None):
+    # average is the 7-day average of every region on that day
+    view = view or WORLD
+    if rows is None:
+        rows = np.arange(len(labels))
+    counts = np.asarray(table.counts)[rows, day_idx]
+    nonzero = counts != 0
+
+    # the points counted are the ones sent, margin included, and the
+    # coarsest level is used even when it has too many
+    chosen = None
+    for level in grid:
+        cell_counts = np.bincount(level.cells[rows], weights=counts, minlength=len(level.lat))
+        mask = (cell_counts != 0) & view_mask(level, view, VIEW_MARGIN)
+        if chosen is not None and np.count_nonzero(mask) > MAX_POINTS:
+            break
+        chosen = level, cell_counts, mask
+    level, cell_counts, mask = chosen
+
+    # a cell with a single region carries the name of that region
+    cells = level.cells[rows]
+    regions = np.bincount(cells, weights=nonzero, minlength=len(level.lat))
+    owner = np.zeros(len(level.lat), dtype=np.intp)
+    owner[cells[nonzero]] = rows[nonzero]
+    names = np.where(regions == 1, labels[owner], np.char.mod('%d regions', regions).astype(object))
+
+    if average is not None:
+        # the averages of the regions add up like their counts
+        average = np.bincount(cells, weights=np.asarray(average)[rows], minlength=len(level.lat))[mask]
+    cell_counts = cell_counts[mask]
+    return dict(
+        type='scattergeo',
+        lat=level.lat[mask].tolist(),
+        lon=level.lon[mask].tolist(),
+        text=hover_text(names[mask], cell_counts, average).tolist(),
+        hoverinfo='text',
+        marker=dict(
+            size=np.abs(cell_counts / SIZE_SCALE).tolist(),
+            sizemode='area',
+            color=color
+        )
+    )
@@ -0,0 +1,64 @@
+"""
+Vectorized construction of the infection map traces.
+
+map_traces() takes the Lat/Long arrays and the full (region x day) count
+matrix of a snapshot table and produces the Scattergeo trace dicts for any
+set of days in one NumPy pass, without a pandas copy per day. rows limits
+the traces to a subset of the regions, e.g. the provinces of one country.
+average, the (region x selected day) 7-day average of new cases, adds it
+to the hover text.
+"""
+import numpy as np
+
+MARKER_COLOR = '#f0ad4e'
+SIZE_SCALE = 50
+
+
+def region_labels(table):
+    return np.array([
+        country if not province or province == country else f'{province}, {country}'
+        for province, country in zip(table.province, table.country)
+    ], dtype=object)
+
+
+def hover_text(labels, counts, average=None):
+    text = labels + '<br>' + np.char.mod('%d', counts).astype(object)
+    if average is not None:
+        text = text + '<br>' + np.char.mod('%+.0f a day (7-day average)', average).astype(object)
+    return text
+
+
+def map_traces(table, day_idxs, labels=None, color=MARKER_COLOR, rows=None, average=None):
+    if labels is None:
+        labels = region_labels(table)
+    day_idxs = np.asarray(day_idxs, dtype=np.intp)
+    if rows is None:
+        rows = slice(None)
+    lat = np.asarray(table.lat)[rows]
+    lon = np.asarray(table.long)[rows]
+    labels = labels[rows]
+
+    # (region x selected day) blocks, computed once for all days
+    counts = np.asarray(table.counts)[rows][:, day_idxs]
+    visible = counts != 0
+    sizes = np.abs(counts / SIZE_SCALE)
+    if average is not None:
+        average = np.asarray(average)[rows]
+    text = hover_text(labels[:, None], counts, average)
+
+    traces = []
+    for k in range(len(day_idxs)):
+        mask = visible[:, k]
+        traces.append(dict(
+            type='scattergeo',
+            lat=lat[mask].tolist(),
+            lon=lon[mask].tolist(),
+            text=text[mask, k].tolist(),
+            hoverinfo='text',
+            marker=dict(
+                size=sizes[mask, k].tolist(),
+                sizemode='area',
+                color=color
+            )
+        ))
+    return traces
@@ -0,0 +1,144 @@
+"""
+Opt-in per callback instrumentation (DASH_METRICS=1).
+
+instrument(app) wraps app.callback, so every server callback registered
+afterwards is tracked under its function name: a latency histogram of the
+whole _dash-update-component request, request and response size histograms
+and an error counter. The numbers are served as Prometheus text on /metrics.
+Without the environment variable nothing is wrapped and nothing is added to
+the request path. Every worker process keeps its own counters.
+
+Responses served from the callback cache of http_cache.py are counted under
+the name of their callback with cache="hit", the others with cache="miss",
+or cache="off" when that cache is turned off.
+"""
+import bisect
+import functools
+import threading
+import time
+
+import flask
+from dash.exceptions import PreventUpdate
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class CallbackStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.errors = 0
+
+
+class CallbackMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _get(self, name, cache):
+        stats = self._stats.get((name, cache))
+        if stats is None:
+            stats = self._stats[(name, cache)] = CallbackStats()
+        return stats
+
+    def observe(self, name, seconds, request_bytes, response_bytes, cache='off'):
+        with self._lock:
+            stats = self._get(name, cache)
+            stats.latency.observe(seconds)
+            stats.request_bytes.observe(request_bytes)
+            stats.response_bytes.observe(response_bytes)
+
+    def error(self, name, cache='off'):
+        with self._lock:
+            self._get(name, cache).errors += 1
+
+    def render(self):
+        metrics = [
+            ('dash_callback_duration_seconds', 'histogram', 'Latency of the callback requests.', 'latency'),
+            ('dash_callback_request_bytes', 'histogram', 'Size of the callback request bodies.', 'request_bytes'),
+            ('dash_callback_response_bytes', 'histogram', 'Size of the callback responses.', 'response_bytes'),
+        ]
+        with self._lock:
+            lines = []
+            for name, kind, description, attribute in metrics:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+                for (callback, cache), stats in sorted(self._stats.items()):
+                    lines.extend(getattr(stats, attribute).lines(name, f'callback="{callback}",cache="{cache}"'))
+            lines += ['# HELP dash_callback_errors_total Callbacks that raised an exception.',
+                      '# TYPE dash_callback_errors_total counter']
+            for (callback, cache), stats in sorted(self._stats.items()):
+                lines.append(f'dash_callback_errors_total{{callback="{callback}",cache="{cache}"}} {stats.errors}')
+        return '\n'.join(lines) + '\n'
+
+
+def instrument(app, route='/metrics'):
+    metrics = CallbackMetrics()
+    register = app.callback
+
+    def track(func):
+        @functools.wraps(func)
+        def tracked(*args, **kwargs):
+            # after_request only knows the url, the name is passed through flask.g
+            flask.g.dash_callback = func.__name__
+            try:
+                return func(*args, **kwargs)
+            except PreventUpdate:
+                raise
+            except Exception:
+                metrics.error(func.__name__, flask.g.get('dash_callback_cache', 'off'))
+                raise
+        return tracked
+
+    def callback(*args, **kwargs):
+        decorator = register(*args, **kwargs)
+        return lambda func: decorator(track(func))
+
+    app.callback = callback
+    server = app.server
+
+    @server.before_request
+    def start_timer():
+        if flask.request.path.endswith('_dash-update-component'):
+            flask.g.dash_callback_start = time.perf_counter()
+
+    @server.after_request
+    def record(response):
+        name = flask.g.get('dash_callback')
+        if name is not None:
+            seconds = time.perf_counter() - flask.g.dash_callback_start
+            response_bytes = response.calculate_content_length()
+            if response_bytes is None:
+                response_bytes = 0 if response.is_streamed else len(response.get_data())
+            metrics.observe(name, seconds, flask.request.content_length or 0, response_bytes,
+                            flask.g.get('dash_callback_cache', 'off'))
+        return response
+
+    def serve_metrics():
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    server.add_url_rule(route, 'dash_metrics', serve_metrics)
+    return metrics
@@ -0,0 +1,45 @@
+"""
+Registry of the pages of the multipage app.
+
+Every page is registered with a factory building its layout. The factory
+only runs on the first visit of the page and its layout is cached after
+that, so starting a worker doesn't load any data or build any figure. The
+page modules still register their callbacks when they are imported.
+Layouts built from the dataset are dropped with invalidate() when a new
+dataset version is swapped in.
+"""
+import threading
+
+_LOCK = threading.Lock()
+_FACTORIES = {}
+_VALIDATION_FACTORIES = {}
+_LAYOUTS = {}
+
+
+def register_page(name, factory, validation_factory=None):
+    # validation_factory builds the same components without data, pages that
+    # are cheap to build can leave it out
+    _FACTORIES[name] = factory
+    _VALIDATION_FACTORIES[name] = validation_factory or factory
+
+
+def page_layout(name):
+    if name not in _FACTORIES:
+        return None
+    layout = _LAYOUTS.get(name)
+    if layout is None:
+        with _LOCK:
+            layout = _LAYOUTS.get(name)
+            if layout is None:
+                layout = _LAYOUTS[name] = _FACTORIES[name]()
+    return layout
+
+
+def invalidate(*names):
+    # no lock, this can run from a factory loading the dataset
+    for name in names or list(_LAYOUTS):
+        _LAYOUTS.pop(name, None)
+
+
+def validation_layouts():
+    return [factory() for factory in _VALIDATION_FACTORIES.values()]
@@ -0,0 +1,75 @@
+"""
+Background refresh of the dataset, every COVID_REFRESH_INTERVAL seconds.
+
+A poll first looks at the CURRENT pointer of the snapshot store, where
+another worker may already have written a newer version, and then at the
+header of the source. When the source only appended days, just those
+columns are read and appended to the snapshot, anything else rebuilds it.
+The new snapshot is written as a new version, read back memory mapped and
+swapped in as the current dataset.
+"""
+import os
+import threading
+import time
+import traceback
+
+import data_store
+import dataset
+
+INTERVAL = float(os.environ.get('COVID_REFRESH_INTERVAL', 0))
+
+_LOCK = threading.Lock()
+_STARTED_PID = None
+
+
+def poll(source=data_store.DATA_SOURCE, snapshot_dir=data_store.SNAPSHOT_DIR):
+    # returns the version swapped in, or None when nothing changed
+    ds = dataset.current()
+    version = data_store.current_version(snapshot_dir)
+    if version not in (None, ds.version):
+        return adopt(ds, data_store.read_snapshot(snapshot_dir, version))
+
+    old_days = ds.snapshot.source_days
+    source_days = data_store.published_days(source)
+    if source_days == old_days:
+        return None
+    snapshot = None
+    if source_days[:len(old_days)] == old_days:
+        dfs = data_store.read_source_days(source, source_days[len(old_days):])
+        try:
+            snapshot = data_store.extend_snapshot(ds.snapshot, dfs)
+        except ValueError:
+            pass
+    if snapshot is None:
+        snapshot = data_store.build_snapshot(data_store.read_source(source))
+    data_store.write_snapshot(snapshot, snapshot_dir)
+    # the arrays built here are dropped for the memory mapped copy
+    return adopt(ds, data_store.read_snapshot(snapshot_dir, snapshot.version))
+
+
+def adopt(ds, snapshot):
+    dataset.swap(dataset.next_dataset(ds, snapshot))
+    return snapshot.version
+
+
+def run(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            poll()
+        except Exception:
+            # a bad poll keeps the current dataset, the next one tries again
+            traceback.print_exc()
+
+
+def ensure_started(ds=None, interval=INTERVAL):
+    # can be used as a dataset.on_load() listener: it runs in every worker
+    # after the fork, where the polling thread has to live
+    global _STARTED_PID
+    if interval <= 0:
+        return
+    with _LOCK:
+        if _STARTED_PID == os.getpid():
+            return
+        _STARTED_PID = os.getpid()
+    threading.Thread(target=run, args=(interval,), daemon=True, name='dataset-refresher').start()
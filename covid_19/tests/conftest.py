@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(TESTS_DIR)
+# the app modules import each other as top level modules, the fixture
+# dataset comes from the benchmarks
+sys.path.insert(0, APP_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(APP_DIR), 'benchmarks'))
+
+import data_store  # noqa: E402
+from fixtures import write_covid_fixture  # noqa: E402
+
+DAYS = 40
+FIRST_DAYS = 30
+
+
+def trim_source(directory, days):
+    # keeps the first days of every source CSV
+    for covid_state in data_store.COVID_STATES:
+        path = data_store.source_path(directory, covid_state)
+        df = pd.read_csv(path)
+        df.iloc[:, :len(data_store.ID_COLUMNS) + days].to_csv(path, index=False)
+
+
+@pytest.fixture
+def source(tmp_path):
+    # the full source and a copy that stops FIRST_DAYS in
+    full = write_covid_fixture(str(tmp_path / 'full'), regions=120, days=DAYS)
+    first = write_covid_fixture(str(tmp_path / 'first'), regions=120, days=DAYS)
+    trim_source(first, FIRST_DAYS)
+    return full, first
@@ -0,0 +1,102 @@
+"""
+The incremental paths of a refresh have to give what a full rebuild gives.
+"""
+import numpy as np
+import pytest
+
+import data_store
+import dataset
+import derived
+import refresher
+from conftest import DAYS, FIRST_DAYS
+from cube import build_cube, extend_cube
+from hierarchy import build_hierarchy, extend_hierarchy
+
+
+def assert_derived_equal(actual, expected):
+    for name, a, b in zip(derived.Derived._fields, actual, expected):
+        np.testing.assert_allclose(a, b, equal_nan=True, err_msg=name)
+
+
+def new_days(source, start):
+    days = data_store.published_days(source)[start:]
+    return data_store.read_source_days(source, days)
+
+
+@pytest.fixture
+def snapshots(source):
+    full, first = source
+    rebuilt = data_store.build_snapshot(data_store.read_source(full))
+    previous = data_store.build_snapshot(data_store.read_source(first))
+    extended = data_store.extend_snapshot(previous, new_days(full, FIRST_DAYS))
+    return previous, extended, rebuilt
+
+
+def test_extend_snapshot(snapshots):
+    _, extended, rebuilt = snapshots
+    assert extended.version == rebuilt.version
+    assert extended.days == rebuilt.days
+    assert extended.source_days == rebuilt.source_days
+    for covid_state in data_store.COVID_STATES:
+        np.testing.assert_array_equal(extended.tables[covid_state].counts, rebuilt.tables[covid_state].counts)
+
+
+def test_extend_cube(snapshots):
+    previous, extended, rebuilt = snapshots
+    cube = extend_cube(build_cube(previous), extended)
+    expected = build_cube(rebuilt)
+    assert cube.days == expected.days
+    assert cube.date_index == expected.date_index
+    np.testing.assert_array_equal(cube.totals, expected.totals)
+    np.testing.assert_array_equal(cube.changes, expected.changes)
+
+
+def test_extend_hierarchy(snapshots):
+    previous, extended, rebuilt = snapshots
+    hierarchy = extend_hierarchy(build_hierarchy(previous), extended, FIRST_DAYS)
+    expected = build_hierarchy(rebuilt)
+    assert list(hierarchy.countries) == list(expected.countries)
+    np.testing.assert_array_equal(hierarchy.totals, expected.totals)
+    np.testing.assert_array_equal(hierarchy.changes, expected.changes)
+
+
+def test_extend_derived(snapshots):
+    _, _, rebuilt = snapshots
+    counts = np.asarray(rebuilt.tables['Confirmed'].counts)
+    # appending a single day and less than a window of days as well
+    for start in (1, FIRST_DAYS, DAYS - 1):
+        assert_derived_equal(derived.extend(derived.derive(counts[:, :start]), counts, start), derived.derive(counts))
+
+
+def test_next_dataset(snapshots):
+    previous, extended, rebuilt = snapshots
+    ds = dataset.next_dataset(dataset.build_dataset(previous), extended)
+    expected = dataset.build_dataset(rebuilt)
+    assert ds.version == expected.version
+    assert_derived_equal(ds.metrics.total, expected.metrics.total)
+    assert_derived_equal(ds.metrics.countries, expected.metrics.countries)
+
+
+@pytest.fixture
+def current():
+    yield
+    dataset._CURRENT = None
+
+
+def test_poll_adopts_appended_days(source, tmp_path, current):
+    full, first = source
+    snapshot_dir = str(tmp_path / 'snapshot')
+    data_store.refresh(first, snapshot_dir)
+    dataset.swap(dataset.build_dataset(data_store.read_snapshot(snapshot_dir)))
+    assert refresher.poll(first, snapshot_dir) is None
+
+    published = data_store.published_days(full)
+    version = refresher.poll(full, snapshot_dir)
+    ds = dataset.current()
+    expected = dataset.build_dataset(data_store.build_snapshot(data_store.read_source(full)))
+    assert version == ds.version == expected.version == data_store.current_version(snapshot_dir)
+    assert ds.snapshot.source_days == published
+    np.testing.assert_array_equal(ds.cube.totals, expected.cube.totals)
+    np.testing.assert_array_equal(ds.hierarchy.totals, expected.hierarchy.totals)
+    assert_derived_equal(ds.metrics.total, expected.metrics.total)
+    assert refresher.poll(full, snapshot_dir) is None
@@ -0,0 +1,18 @@
+"""
+Production entry point of the COVID-19 app.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+With preload_app (see gunicorn.conf.py) this module is imported once in the
+master: the snapshot is refreshed if asked to, its count matrices are memory
+mapped and the aggregates are built before the workers are forked. The
+workers inherit all of it, so they boot without loading any data and the
+matrices stay in the page cache once however many workers there are.
+gunicorn.conf.py vendors the theme into assets/ before that, so no page
+links the CDN.
+"""
+import dataset
+from index import app
+
+server = app.server
+dataset.preload()
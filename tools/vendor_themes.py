@@ -0,0 +1,141 @@
+"""
+Vendors the Bootswatch themes of the apps into their assets folders.
+
+The theme CSS is downloaded once, minified and written as
+assets/theme.<hash>.css, the fonts it imports are stored next to it under
+assets/fonts/ with their hash in the name as well. On machines without
+network access --source points at a directory with the theme files
+(superhero/bootstrap.min.css, ...), their font imports are dropped and the
+font stacks of the theme fall back to the system fonts.
+
+Dash serves and links everything in assets/ by itself and the apps stop
+linking the CDN theme once the file exists. The generated files are not
+checked in, vendoring is a deploy step: covid_19/gunicorn.conf.py runs it
+with --missing before the app is loaded, --check fails while an app has no
+vendored theme. Run it again after upgrading dash-bootstrap-components,
+old files are replaced.
+
+    python tools/vendor_themes.py
+    python tools/vendor_themes.py --source ~/bootswatch/dist
+    python tools/vendor_themes.py --missing --apps covid_19
+    python tools/vendor_themes.py --check
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+import urllib.parse
+import urllib.request
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# app directory -> name of the theme in dbc.themes
+THEMES = {'covid_19': 'SUPERHERO', 'upload_select': 'LUX'}
+HASH_LENGTH = 10
+# seconds, gunicorn.conf.py runs this on start and must not hang on a host
+# without outbound access
+TIMEOUT = 10
+
+IMPORT_RE = re.compile(r'@import\s+url\(\s*["\']?([^"\')]+)["\']?\s*\)\s*;')
+URL_RE = re.compile(r'url\(\s*["\']?([^"\')]+)["\']?\s*\)')
+COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+# browsers get woff2 from Google Fonts with a recent user agent
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        return response.read()
+
+
+def minify(css):
+    css = COMMENT_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha1(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def vendor_fonts(css, assets_dir, written):
+    # the Google Fonts stylesheets are inlined and their font files stored
+    # locally, so nothing is loaded from another host
+    def inline(match):
+        font_css = fetch(match.group(1)).decode('utf-8')
+
+        def store(font):
+            url = font.group(1)
+            data = fetch(url)
+            name = fingerprint(os.path.basename(urllib.parse.urlparse(url).path), data)
+            path = os.path.join(assets_dir, 'fonts', name)
+            write(path, data)
+            written.add(path)
+            return f'url(fonts/{name})'
+
+        return URL_RE.sub(store, font_css)
+
+    return IMPORT_RE.sub(inline, css)
+
+
+def is_vendored(app_dir):
+    return bool(glob.glob(os.path.join(ROOT_DIR, app_dir, 'assets', 'theme.*.css')))
+
+
+def vendor(app_dir, theme_url, source=None):
+    assets_dir = os.path.join(ROOT_DIR, app_dir, 'assets')
+    # the old files are only removed once the new ones are written, so a
+    # failed run leaves a working theme behind
+    old_files = glob.glob(os.path.join(assets_dir, 'fonts', '*')) + glob.glob(os.path.join(assets_dir, 'theme.*.css'))
+    written = set()
+    if source is None:
+        css = vendor_fonts(fetch(theme_url).decode('utf-8'), assets_dir, written)
+    else:
+        # .../bootswatch/4.x/superhero/bootstrap.min.css
+        theme, file_name = urllib.parse.urlparse(theme_url).path.split('/')[-2:]
+        with open(os.path.join(source, theme, file_name), encoding='utf-8') as f:
+            css = IMPORT_RE.sub('', f.read())
+    data = minify(css).encode('utf-8')
+    name = fingerprint('theme.css', data)
+    write(os.path.join(assets_dir, name), data)
+    written.add(os.path.join(assets_dir, name))
+    for old in set(old_files) - written:
+        os.remove(old)
+    return os.path.join(app_dir, 'assets', name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', nargs='+', default=list(THEMES), choices=list(THEMES))
+    parser.add_argument('--source', help='directory with the theme files instead of the CDN')
+    parser.add_argument('--missing', action='store_true', help='only the apps without a vendored theme')
+    parser.add_argument('--check', action='store_true', help='fail if an app has no vendored theme')
+    args = parser.parse_args()
+
+    if args.check:
+        missing = [app_dir for app_dir in args.apps if not is_vendored(app_dir)]
+        for app_dir in missing:
+            print(f'{app_dir} links the CDN theme, run tools/vendor_themes.py', file=sys.stderr)
+        return 1 if missing else 0
+
+    import dash_bootstrap_components as dbc
+
+    for app_dir in args.apps:
+        if args.missing and is_vendored(app_dir):
+            continue
+        print(vendor(app_dir, getattr(dbc.themes, THEMES[app_dir]), args.source))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+// Streams the selected file to the /_upload routes in raw binary chunks and
+// hands the resulting upload id to Dash through the hidden 'upload-handle'
+// input, see uploads.py.
+(function() {
+    var CHUNK_SIZE = 4 * 1024 * 1024;
+    var PREFIX = '/_upload';
+
+    function post(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            body: body,
+            headers: {'Content-Type': 'application/octet-stream'}
+        }).then(function(response) {
+            return response.json().catch(function() { return {}; }).then(function(data) {
+                data.status = response.status;
+                return data;
+            });
+        });
+    }
+
+    function setDashValue(id, value) {
+        var input = document.getElementById(id);
+        var setter = Object.getOwnPropertyDescriptor(window.HTMLInputElement.prototype, 'value').set;
+        setter.call(input, value);
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+    }
+
+    function setStatus(text) {
+        var status = document.getElementById('upload-status');
+        if (status) {
+            status.textContent = text;
+        }
+    }
+
+    function sendChunks(file, handle, offset) {
+        if (offset >= file.size) {
+            var name = encodeURIComponent(file.name);
+            return post(PREFIX + '/' + handle + '/finish?filename=' + name);
+        }
+        setStatus('Uploading ' + file.name + ' ' + Math.round(100 * offset / file.size) + '%');
+        var chunk = file.slice(offset, offset + CHUNK_SIZE);
+        return post(PREFIX + '/' + handle + '?offset=' + offset, chunk).then(function(data) {
+            if (data.status !== 200 && data.status !== 409) {
+                throw new Error('upload failed with status ' + data.status);
+            }
+            return sendChunks(file, handle, data.offset);
+        });
+    }
+
+    function upload(file) {
+        if (!file) {
+            return;
+        }
+        post(PREFIX + '/start').then(function(data) {
+            return sendChunks(file, data.handle, 0);
+        }).then(function(info) {
+            setStatus(info.filename);
+            setDashValue('upload-handle', info.handle);
+        }).catch(function(error) {
+            setStatus('There was an error uploading this file.');
+            console.error(error);
+        });
+    }
+
+    // dash_html_components has no file input, so a hidden one is added to
+    // the page and opened by the 'Browse Files' button
+    function fileInput() {
+        var input = document.getElementById('upload-file-input');
+        if (!input) {
+            input = document.createElement('input');
+            input.type = 'file';
+            input.id = 'upload-file-input';
+            input.style.display = 'none';
+            input.addEventListener('change', function() {
+                upload(input.files[0]);
+                // the same file can be picked again
+                input.value = '';
+            });
+            document.body.appendChild(input);
+        }
+        return input;
+    }
+
+    document.addEventListener('click', function(event) {
+        if (event.target.closest && event.target.closest('#upload-browse')) {
+            event.preventDefault();
+            fileInput().click();
+        }
+    });
+
+    document.addEventListener('dragover', function(event) {
+        if (event.target.closest && event.target.closest('#upload-data')) {
+            event.preventDefault();
+        }
+    });
+
+    document.addEventListener('drop', function(event) {
+        if (event.target.closest && event.target.closest('#upload-data')) {
+            event.preventDefault();
+            upload(event.dataTransfer.files[0]);
+        }
+    });
+})();
@@ -0,0 +1,169 @@
+"""
+Disk backed store of parsed upload datasets.
+
+Every dataset is written once as an uncompressed Arrow/Feather file named
+after its id and read back memory mapped, so pages and batches are sliced
+without copying the whole frame into the worker. It is written one record
+batch per chunk of the upload, so the whole frame is never held while
+writing either. A chunk whose types don't fit the columns written so far
+(a float after integers, text after numbers) widens them and the file is
+written again. The callbacks only pass
+the dataset id around. Files that were not used for DATASET_TTL seconds are
+removed, and the least recently used ones go first once the store is larger
+than DATASET_STORE_MB.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+STORE_DIR = os.environ.get('DATASET_STORE_DIR', os.path.join(tempfile.gettempdir(), 'upload_select_datasets'))
+TTL = int(os.environ.get('DATASET_TTL', 3600))
+MAX_STORE_BYTES = int(os.environ.get('DATASET_STORE_MB', 4096)) * 1024 * 1024
+MAX_OPEN_TABLES = 16
+
+_LOCK = threading.Lock()
+_TABLES = OrderedDict()
+
+
+def dataset_path(dataset_id):
+    if not dataset_id.isalnum():
+        raise ValueError(f'Invalid dataset id {dataset_id!r}')
+    return os.path.join(STORE_DIR, f'{dataset_id}.feather')
+
+
+def exists(dataset_id):
+    return os.path.exists(dataset_path(dataset_id))
+
+
+def to_arrow(df):
+    df = df.reset_index(drop=True)
+    df.columns = [str(column) for column in df.columns]
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # columns mixing types are stored as strings
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].map(lambda value: value if value is None else str(value))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def widen_type(written, chunk):
+    if written == chunk or pa.types.is_null(chunk):
+        return written
+    if pa.types.is_null(written):
+        return chunk
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (written, chunk)):
+        return pa.float64()
+    return pa.string()
+
+
+class SchemaChanged(Exception):
+    def __init__(self, schema):
+        super().__init__('the columns were widened')
+        self.schema = schema
+
+
+def write_batches(path, frames, schema=None):
+    writer = None
+    try:
+        for df in frames:
+            table = to_arrow(df).replace_schema_metadata(None)
+            if schema is None:
+                schema = table.schema
+            widened = pa.schema([field.with_type(widen_type(field.type, chunk_type))
+                                 for field, chunk_type in zip(schema, table.schema.types)])
+            if writer is not None and not widened.equals(schema):
+                raise SchemaChanged(widened)
+            schema = widened
+            table = table.cast(schema)
+            if writer is None:
+                writer = ipc.new_file(path, schema)
+            writer.write_table(table)
+        if writer is None:
+            writer = ipc.new_file(path, schema or pa.schema([]))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def put_frames(dataset_id, frames):
+    # frames() returns an iterator over the chunks of the dataset, it is
+    # called again when a later chunk widens the columns
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = dataset_path(dataset_id)
+    tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    schema = None
+    try:
+        while True:
+            try:
+                # no compression, so the file can be memory mapped without decoding
+                write_batches(tmp_path, frames(), schema)
+                break
+            except SchemaChanged as e:
+                schema = e.schema
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict()
+    return dataset_id
+
+
+def put(dataset_id, df):
+    return put_frames(dataset_id, lambda: [df])
+
+
+def open_table(dataset_id):
+    path = dataset_path(dataset_id)
+    with _LOCK:
+        table = _TABLES.get(dataset_id)
+        if table is not None:
+            _TABLES.move_to_end(dataset_id)
+    if table is None:
+        table = feather.read_table(path, memory_map=True)
+        with _LOCK:
+            _TABLES[dataset_id] = table
+            while len(_TABLES) > MAX_OPEN_TABLES:
+                _TABLES.popitem(last=False)
+    # the modification time doubles as last access time for the eviction
+    os.utime(path)
+    return table
+
+
+def read_page(dataset_id, start, size):
+    return open_table(dataset_id).slice(start, size).to_pandas()
+
+
+def iter_batches(dataset_id, batch_rows):
+    table = open_table(dataset_id)
+    for start in range(0, table.num_rows, batch_rows):
+        yield table.slice(start, batch_rows).to_pandas()
+
+
+def evict(now=None):
+    if not os.path.isdir(STORE_DIR):
+        return
+    now = now or time.time()
+    entries = sorted(
+        (entry for entry in os.scandir(STORE_DIR) if entry.name.endswith('.feather')),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    total = 0
+    for entry in entries:
+        stat = entry.stat()
+        total += stat.st_size
+        if now - stat.st_mtime > TTL or total > MAX_STORE_BYTES:
+            dataset_id = entry.name[:-len('.feather')]
+            with _LOCK:
+                _TABLES.pop(dataset_id, None)
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,72 @@
+"""
+Server side cache of parsed uploads keyed by the sha256 of the file.
+
+Both upload callbacks fire on the same handle, usually at the same time, so
+the first one parses the file and the second one waits for it and gets the
+same DataFrame. Entries are evicted least recently used first once the
+DataFrames together use more than max_bytes.
+"""
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def frame_size(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class ParsedCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, parse):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = threading.Event()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+
+        if not owner:
+            pending.wait()
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key][0]
+            # the parse failed or the entry was too big to keep, do it ourselves
+            return parse()
+
+        try:
+            df = parse()
+            self.put(key, df)
+            return df
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set()
+
+    def put(self, key, df):
+        size = frame_size(df)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
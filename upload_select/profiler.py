@@ -0,0 +1,113 @@
+"""
+Streaming column profiler for uploaded files.
+
+The file is read in chunks and every column keeps a constant amount of
+state: row and null counts, min/max, the dtypes seen so far and a
+HyperLogLog sketch for the number of distinct values. Memory use does not
+grow with the file size. Columns with few distinct values compared to the
+number of rows are reported as 'enum'.
+"""
+import numpy as np
+import pandas as pd
+
+# the types reported besides the numpy dtypes of numeric columns
+DATA_TYPES = ['object', 'enum']
+OBJECT, ENUM = DATA_TYPES
+HLL_PRECISION = 12
+ENUM_MAX_DISTINCT = 50
+ENUM_MAX_RATIO = 0.5
+
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return
+        width = 64 - self.precision
+        idx = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # position of the leftmost 1 bit in the remaining bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class ColumnProfile:
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        self.dtypes = set()
+        self.sketch = HyperLogLog()
+
+    def update(self, series):
+        self.rows += len(series)
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        if values.empty:
+            return
+        self.dtypes.add(values.dtype)
+        self.sketch.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        try:
+            low, high = values.min(), values.max()
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        except TypeError:
+            # mixed types have no ordering
+            pass
+
+    def dtype(self):
+        if not self.dtypes:
+            return np.dtype(object)
+        if all(dtype.kind in 'biuf' for dtype in self.dtypes):
+            return np.result_type(*self.dtypes)
+        if len(self.dtypes) == 1:
+            return next(iter(self.dtypes))
+        return np.dtype(object)
+
+    def result(self):
+        dtype = self.dtype()
+        non_null = self.rows - self.nulls
+        # the estimate can overshoot on small columns
+        distinct = min(self.sketch.count(), non_null)
+        is_enum = (
+            dtype.kind in 'Obiu'
+            and 0 < distinct <= ENUM_MAX_DISTINCT
+            and distinct <= ENUM_MAX_RATIO * non_null
+        )
+        return {
+            'column': str(self.name),
+            'rows': self.rows,
+            'type': ENUM if is_enum else OBJECT if dtype.kind == 'O' else str(dtype),
+            'distinct': distinct,
+            'null_rate': self.nulls / self.rows if self.rows else 0.0,
+            'min': None if self.minimum is None else str(self.minimum),
+            'max': None if self.maximum is None else str(self.maximum),
+        }
+
+
+def profile_chunks(chunks):
+    profiles = {}
+    for chunk in chunks:
+        for name in chunk.columns:
+            if name not in profiles:
+                profiles[name] = ColumnProfile(name)
+            profiles[name].update(chunk[name])
+    return [profile.result() for profile in profiles.values()]
@@ -0,0 +1,139 @@
+"""
+Content based format detection and fast readers for uploaded files.
+
+The format is sniffed from the first bytes of the file rather than trusted
+from its name: zip containers with an xl/ folder are xlsx, OLE2 containers
+are legacy xls, anything else is treated as delimited text whose encoding
+and delimiter are sniffed from a sample.
+
+CSV files are read by the pyarrow engine for full reads when it is
+installed and by the C engine otherwise. xlsx files are streamed row by row
+with openpyxl in read-only mode, so a preview stops after the requested
+rows instead of loading the whole workbook. iter_frames() reads a whole
+file in chunks of rows, so ingesting it doesn't load it at once either.
+"""
+import codecs
+import csv
+import zipfile
+from collections import namedtuple
+from itertools import islice
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+SAMPLE_BYTES = 64 * 1024
+DELIMITERS = ',;\t|'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_MAGIC = b'PK\x03\x04'
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+FileFormat = namedtuple('FileFormat', ['kind', 'encoding', 'delimiter'])
+
+
+def sniff_encoding(sample):
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    # the sample may end in the middle of a multi-byte character
+    for cut in range(4):
+        try:
+            sample[:len(sample) - cut].decode('utf-8')
+            return 'utf-8'
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def sniff_delimiter(text):
+    lines = text.splitlines()
+    # the last line may be cut off
+    sample = '\n'.join(lines[:-1] if len(lines) > 1 else lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+
+def sniff_format(path):
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_BYTES)
+
+    if sample.startswith(XLS_MAGIC):
+        return FileFormat('xls', None, None)
+    if sample.startswith(ZIP_MAGIC):
+        with zipfile.ZipFile(path) as archive:
+            if any(name.startswith('xl/') for name in archive.namelist()):
+                return FileFormat('xlsx', None, None)
+        raise ValueError('Zip archives other than xlsx workbooks are not supported')
+    if b'\x00' in sample and not sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        raise ValueError('The file does not look like a CSV or Excel file')
+
+    encoding = sniff_encoding(sample)
+    text = sample.decode(encoding, errors='ignore')
+    return FileFormat('csv', encoding, sniff_delimiter(text))
+
+
+def xlsx_rows(path):
+    import openpyxl
+
+    # uploads are stored without an extension, which openpyxl refuses for a
+    # path but not for an open file, kept open while the rows are read
+    with open(path, 'rb') as f:
+        yield from workbook_rows(openpyxl.load_workbook(f, read_only=True, data_only=True))
+
+
+def workbook_rows(workbook):
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [f'Unnamed: {i}' if name is None else name for i, name in enumerate(header)]
+        yield header
+        for row in rows:
+            yield list(row[:len(header)]) + [None] * (len(header) - len(row))
+    finally:
+        workbook.close()
+
+
+def read_xlsx(path, nrows=None, chunksize=None):
+    rows = xlsx_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return [] if chunksize is not None else pd.DataFrame()
+    if chunksize is not None:
+        return (pd.DataFrame(chunk, columns=header) for chunk in iter(lambda: list(islice(rows, chunksize)), []))
+    return pd.DataFrame(list(islice(rows, nrows)), columns=header)
+
+
+def read_frame(path, file_format=None, nrows=None):
+    file_format = file_format or sniff_format(path)
+    if file_format.kind == 'csv':
+        # the pyarrow engine is the fastest for full reads but can't stop early
+        engine = CSV_ENGINE if nrows is None else 'c'
+        return pd.read_csv(path, sep=file_format.delimiter, encoding=file_format.encoding,
+                           nrows=nrows, engine=engine)
+    elif file_format.kind == 'xlsx':
+        return read_xlsx(path, nrows=nrows)
+    return pd.read_excel(path, nrows=nrows)
+
+
+def iter_frames(path, chunksize, file_format=None):
+    # the whole file in frames of at most chunksize rows
+    file_format = file_format or sniff_format(path)
+    if file_format.kind == 'csv':
+        return pd.read_csv(path, sep=file_format.delimiter, encoding=file_format.encoding,
+                           chunksize=chunksize)
+    elif file_format.kind == 'xlsx':
+        return read_xlsx(path, chunksize=chunksize)
+    # legacy xls files can't be streamed
+    return [pd.read_excel(path)]
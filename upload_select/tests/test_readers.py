@@ -0,0 +1,23 @@
+"""
+Uploads are stored under their handle, without the extension of the file.
+"""
+import pandas as pd
+
+import readers
+
+
+def write_upload(tmp_path, df):
+    path = tmp_path / 'xlsx'
+    df.to_excel(str(path) + '.xlsx', index=False)
+    (tmp_path / 'xlsx.xlsx').rename(path)
+    return str(path)
+
+
+def test_extensionless_xlsx(tmp_path):
+    df = pd.DataFrame({'a': range(25), 'b': [f'row {i}' for i in range(25)]})
+    path = write_upload(tmp_path, df)
+    assert readers.sniff_format(path).kind == 'xlsx'
+    pd.testing.assert_frame_equal(readers.read_frame(path, nrows=3), df.head(3))
+    chunks = list(readers.iter_frames(path, 10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
@@ -5,36 +5,102 @@ from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 import dash_table as dt
 import datetime
-import pandas as pd
-import base64
-import io
+import glob
+import os
+import re
+import flask
+import uploads
+from parsed_cache import ParsedCache
+from profiler import profile_chunks
+import readers
+import dataset_store
+import functools
 
 
-DATA_TYPES = ['object', 'enum']
+PAGE_SIZE = 20
+PREVIEW_ROWS = 100
+PROFILE_CHUNK_ROWS = 100000
+INGEST_CHUNK_ROWS = 100000
+PROFILE_COLUMNS = ['column', 'type', 'distinct', 'null_rate', 'min', 'max']
+# the theme comes from the CDN until tools/vendor_themes.py put it in assets/
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+THEME = [] if glob.glob(os.path.join(ASSETS_DIR, 'theme.*.css')) else [dbc.themes.LUX]
 
 
-def parse_contents(contents, filename):
-    content_type, content_string = contents.split(',')
+def read_upload(handle, nrows=None):
+    # the file was streamed to disk by the upload routes, see uploads.py,
+    # its format is sniffed from the content rather than the file name
+    return readers.read_frame(uploads.upload_path(handle), nrows=nrows)
 
-    decoded = base64.b64decode(content_string)
+
+PARSED_CACHE = ParsedCache(int(os.environ.get('PARSED_CACHE_MB', 512)) * 1024 * 1024)
+
+
+def parse_upload(handle, nrows=None):
+    # the head of each file is parsed once and shared by the preview callbacks
     try:
-        if 'csv' in filename:
-            # Assume that the user uploaded a CSV file
-            df = pd.read_csv(
-                io.StringIO(decoded.decode('utf-8')), nrows=100)
-        elif 'xls' in filename:
-            # Assume that the user uploaded an excel file
-            df = pd.read_excel(io.BytesIO(decoded), nrows=100)
+        key = (uploads.upload_info(handle)['sha256'], nrows)
+        return PARSED_CACHE.get(key, lambda: read_upload(handle, nrows))
     except Exception as e:
         print(e)
-        return html.Div([
-            'There was an error processing this file.'
-        ])
+        return None
+
+
+def dataset_id_for(handle):
+    return uploads.upload_info(handle)['sha256'][:32]
+
+
+def upload_dataset_id(handle):
+    # None once the upload expired, see uploads.remove_expired
+    try:
+        return dataset_id_for(handle)
+    except (OSError, ValueError) as e:
+        print(e)
+        return None
+
+
+def ingest_upload(handle):
+    # parsed once per file content into the disk backed dataset store, in
+    # chunks so the worker never holds the whole file, the callbacks only
+    # pass the dataset id around
+    dataset_id = dataset_id_for(handle)
+    if not dataset_store.exists(dataset_id):
+        path = uploads.upload_path(handle)
+        dataset_store.put_frames(dataset_id, lambda: readers.iter_frames(path, INGEST_CHUNK_ROWS))
+    uploads.remove_expired(dataset_store.TTL)
+    return dataset_id
+
+
+@functools.lru_cache(maxsize=64)
+def profile_dataset(dataset_id):
+    # the whole dataset is read in batches, the profile itself stays small
+    return profile_chunks(dataset_store.iter_batches(dataset_id, PROFILE_CHUNK_ROWS))
+
+
+def render_parse_error():
+    return html.Div([
+        'There was an error processing this file.'
+    ])
 
-    return df.to_json(date_format='iso', orient='split')
 
+app = dash.Dash(__name__, external_stylesheets=THEME)
+server = app.server
+uploads.register_upload_routes(server)
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LUX])
+
+# same rule as http_cache.immutable_asset of the COVID app
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+
+
+@server.after_request
+def cache_assets(response):
+    # assets are linked with their modification time in the query string,
+    # the vendored theme and fonts have a hash of their content in the name
+    request = flask.request
+    if request.path.startswith('/assets/') and response.status_code in (200, 304):
+        if 'm' in request.args or FINGERPRINT_RE.search(request.path):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 app.layout = dbc.Container(
@@ -45,16 +111,22 @@ app.layout = dbc.Container(
                     dbc.CardHeader('Step 1', className='card-title'),
                     dbc.CardBody(
                         children=[
-                            dcc.Upload(
+                            # files are streamed to the server by assets/upload.js,
+                            # which then sets the upload handle
+                            html.Div(
                                 children=[
                                     dbc.Row(
                                         children=[
                                             html.Div('Drag and drop or '),
-                                            dbc.Button('Browse Files')
+                                            # the file input itself is created by assets/upload.js
+                                            html.Button('Browse Files', id='upload-browse',
+                                                        className='btn btn-primary ml-2')
                                         ],
                                         align='center',
                                         justify='center'
-                                    )
+                                    ),
+                                    html.Div(id='upload-status', style={'text-align': 'center'}),
+                                    dcc.Input(id='upload-handle', type='text', style={'display': 'none'})
                                 ],
                                 id='upload-data'
                             )
@@ -71,7 +143,25 @@ app.layout = dbc.Container(
                         dbc.CardHeader('Step 2', className='card-title'),
                         dbc.CardBody(
                             children=[
-                                dbc.Table(id='data-table')
+                                # column types, distinct counts and null rates of the whole file
+                                dt.DataTable(
+                                    id='data-profile',
+                                    columns=[{'name': column, 'id': column} for column in PROFILE_COLUMNS],
+                                    data=[],
+                                    style_table={'overflowX': 'auto', 'margin-bottom': '1rem'}
+                                ),
+                                html.Div(id='data-profile-message'),
+                                html.Div(id='data-table-message'),
+                                # only the visible page is sliced and sent by the server
+                                dt.DataTable(
+                                    id='data-table',
+                                    columns=[],
+                                    data=[],
+                                    page_action='custom',
+                                    page_current=0,
+                                    page_size=PAGE_SIZE,
+                                    style_table={'overflowX': 'auto'}
+                                )
                             ],
                             id='data-table-container')
                     ],
@@ -81,33 +171,95 @@ app.layout = dbc.Container(
             id='second-step-container',
             style={'display': 'none'}
         ),
+        dcc.Store(id='dataset-id', storage_type='session'),
         html.Div(id='debug')
     ]
 )
 
 
 @app.callback(
-    Output('debug', 'children'),
-    [Input('upload-data', 'contents'),
-     Input('upload-data', 'filename')]
+    [Output('dataset-id', 'data'),
+     Output('debug', 'children')],
+    [Input('upload-handle', 'value')]
 )
-def display_filename(contents, file_name):
-    if contents is not None:
-        return parse_contents(contents, file_name)
-    return None
+def store_dataset(handle):
+    if handle:
+        try:
+            dataset_id = ingest_upload(handle)
+        except Exception as e:
+            print(e)
+            return None, render_parse_error()
+        return dataset_id, f'Dataset {dataset_id}'
+    return None, None
+
 
 @app.callback(
     [Output('second-step-container', 'style'),
-     Output('data-table-container', 'children')],
-    [Input('upload-data', 'contents'),
-     Input('upload-data', 'filename')]
+     Output('data-table-message', 'children'),
+     Output('data-table', 'columns'),
+     Output('data-table', 'page_current')],
+    [Input('upload-handle', 'value')]
+)
+def display_second_step(handle):
+    if handle:
+        # only the first rows are read here so the preview shows up quickly
+        df = parse_upload(handle, PREVIEW_ROWS)
+        if df is None:
+            return {'display': 'block'}, render_parse_error(), [], 0
+        columns = [{'name': str(column), 'id': str(column)} for column in df.columns]
+        return {'display': 'block'}, None, columns, 0
+    return {'display': 'none'}, None, [], 0
+
+
+@app.callback(
+    [Output('data-profile', 'data'),
+     Output('data-profile-message', 'children'),
+     Output('data-table', 'page_count')],
+    [Input('dataset-id', 'data')],
+    [State('data-table', 'page_size')]
+)
+def display_profile(dataset_id, page_size):
+    if not dataset_id:
+        return [], None, 0
+    try:
+        profile = profile_dataset(dataset_id)
+    except Exception as e:
+        print(e)
+        return [], None, 0
+    rows = profile[0]['rows'] if profile else 0
+    message = f'{rows:,} rows, {len(profile):,} columns'
+    page_count = max(-(-rows // page_size), 1)
+    return [dict(row, null_rate='{:.1%}'.format(row['null_rate'])) for row in profile], message, page_count
+
+
+@app.callback(
+    Output('data-table', 'data'),
+    [Input('upload-handle', 'value'),
+     Input('dataset-id', 'data'),
+     Input('data-table', 'page_current'),
+     Input('data-table', 'page_size')]
 )
-def display_second_step(contents, filename):
-    if contents is not None:
-        df = pd.read_json(parse_contents(contents, filename), orient='split')
-        
-        return {'display': 'block'}, dbc.Table.from_dataframe(df, striped=True, hover=True)
-    return {'display': 'none'}, []
+def update_preview_page(handle, dataset_id, page_current, page_size):
+    if not handle:
+        return []
+    start = (page_current or 0) * page_size
+    if start + page_size <= PREVIEW_ROWS:
+        # the first pages come from the quick head read
+        df = parse_upload(handle, PREVIEW_ROWS)
+    elif dataset_id is not None and dataset_id == upload_dataset_id(handle):
+        try:
+            df = dataset_store.read_page(dataset_id, start, page_size)
+        except FileNotFoundError as e:
+            # evicted from the store, see dataset_store.evict
+            print(e)
+            return []
+        start = 0
+    else:
+        # still being stored
+        return []
+    if df is None:
+        return []
+    return df.iloc[start:start + page_size].rename(columns=str).to_dict('records')
 
 
 if __name__ == '__main__':
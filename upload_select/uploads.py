@@ -0,0 +1,122 @@
+"""
+Chunked file uploads streamed straight to disk.
+
+The browser (assets/upload.js) asks for an upload id, posts the file in raw
+binary chunks and finally asks the server to finish the upload. Every chunk
+is streamed from the request body into a temp file, so the file is never
+held in memory or base64 encoded. The Dash callbacks only ever see the
+upload id, and the data is read from upload_path(handle).
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+
+import flask
+
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'upload_select'))
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_MB', 2048)) * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+
+HANDLE_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def check_handle(handle):
+    if not handle or not HANDLE_RE.match(handle):
+        raise ValueError(f'Invalid upload handle {handle!r}')
+    return handle
+
+
+def part_path(handle):
+    return os.path.join(UPLOAD_DIR, f'{check_handle(handle)}.part')
+
+
+def upload_path(handle):
+    return os.path.join(UPLOAD_DIR, check_handle(handle))
+
+
+def upload_info(handle):
+    with open(upload_path(handle) + '.json') as f:
+        return json.load(f)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_upload():
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    handle = uuid.uuid4().hex
+    open(part_path(handle), 'wb').close()
+    return flask.jsonify(handle=handle)
+
+
+def receive_chunk(handle):
+    path = part_path(handle)
+    if not os.path.exists(path):
+        flask.abort(404)
+    offset = int(flask.request.args.get('offset', 0))
+    if offset != os.path.getsize(path):
+        # chunks have to arrive in order, tell the client where to resume
+        return flask.jsonify(offset=os.path.getsize(path)), 409
+
+    with open(path, 'ab') as f:
+        stream = flask.request.stream
+        for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+            f.write(block)
+            if f.tell() > MAX_UPLOAD_BYTES:
+                f.close()
+                os.remove(path)
+                flask.abort(413)
+        size = f.tell()
+    return flask.jsonify(offset=size)
+
+
+def finish_upload(handle):
+    path = part_path(handle)
+    if not os.path.exists(path):
+        flask.abort(404)
+    info = {
+        'handle': handle,
+        'filename': os.path.basename(flask.request.args.get('filename', '')),
+        'size': os.path.getsize(path),
+        'sha256': file_digest(path)
+    }
+    with open(upload_path(handle) + '.json', 'w') as f:
+        json.dump(info, f)
+    os.replace(path, upload_path(handle))
+    return flask.jsonify(info)
+
+
+def register_upload_routes(server, prefix='/_upload'):
+    def guarded(view):
+        def wrapper(handle=None):
+            try:
+                return view(handle) if handle is not None else view()
+            except ValueError:
+                flask.abort(400)
+        wrapper.__name__ = f'upload_{view.__name__}'
+        return wrapper
+
+    server.add_url_rule(f'{prefix}/start', view_func=guarded(start_upload), methods=['POST'])
+    server.add_url_rule(f'{prefix}/<handle>', view_func=guarded(receive_chunk), methods=['POST'])
+    server.add_url_rule(f'{prefix}/<handle>/finish', view_func=guarded(finish_upload), methods=['POST'])
+
+
+def remove_expired(max_age, now=None):
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    now = now or time.time()
+    for entry in os.scandir(UPLOAD_DIR):
+        if now - entry.stat().st_mtime > max_age:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass